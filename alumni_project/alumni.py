@@ -3,10 +3,15 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-import re
 from io import BytesIO
 import base64
 
+from ingest import read_uploads
+from merge_engine import merge_datasets
+from phones import normalize_phones, split_phones
+from search_index import SearchIndex
+from upload_cache import get_upload_cache
+
 # Page config
 st.set_page_config(
     page_title="Student Data Manager",
@@ -137,62 +142,13 @@ def t(key):
     return TRANSLATIONS[st.session_state.lang].get(key, key)
 
 
-def clean_phone_number(phone):
-    """Clean and standardize phone numbers to +996XXXXXXXXX format"""
-    if pd.isna(phone):
-        return None
-
-    phone = str(phone).strip()
-    # Remove all non-digit characters
-    digits = re.sub(r'\D', '', phone)
-
-    # Handle different formats
-    if len(digits) == 9:  # 558640927
-        return f"+996{digits}"
-    elif len(digits) == 10 and digits.startswith('0'):  # 0558640927
-        return f"+996{digits[1:]}"
-    elif len(digits) == 12 and digits.startswith('996'):  # 996558640927
-        return f"+{digits}"
-    elif len(digits) == 13 and digits.startswith('996'):  # Already correct
-        return f"+{digits}"
-
-    return phone  # Return original if format unclear
-
-
-def extract_year_from_filename(filename):
-    """Extract all years from filename (e.g., 2023_2024)"""
-    matches = re.findall(r'20\d{2}', filename)
-    if matches:
-        # Return the first year found
-        return int(matches[0])
-    return datetime.now().year
-
-
 def process_uploaded_files(uploaded_files):
     """Process and combine multiple Excel files"""
-    all_data = []
-
-    for file in uploaded_files:
-        try:
-            # Read Excel file (handles both .xls and .xlsx)
-            df = pd.read_excel(file, engine=None)
-
-            # Priority 1: Check if YEAR column exists in the data
-            if 'YEAR' not in df.columns:
-                # Priority 2: Extract year from filename
-                year = extract_year_from_filename(file.name)
-                df['YEAR'] = year
-            else:
-                # YEAR column exists, but fill missing values from filename
-                filename_year = extract_year_from_filename(file.name)
-                df['YEAR'] = df['YEAR'].fillna(filename_year)
-
-            # Convert YEAR to integer
-            df['YEAR'] = df['YEAR'].astype(int)
+    all_data, errors = read_uploads(((file.name, file.getvalue()) for file in uploaded_files),
+                                    cache=get_upload_cache())
 
-            all_data.append(df)
-        except Exception as e:
-            st.error(f"Error processing {file.name}: {str(e)}")
+    if errors:
+        st.error("\n\n".join(f"Error processing {name}: {message}" for name, message in errors))
 
     if not all_data:
         return None
@@ -202,7 +158,10 @@ def process_uploaded_files(uploaded_files):
 
     # Clean phone numbers
     if 'CONTACT_PHONES' in combined_df.columns:
-        combined_df['CONTACT_PHONES_CLEANED'] = combined_df['CONTACT_PHONES'].apply(clean_phone_number)
+        combined_df['CONTACT_PHONES_CLEANED'] = normalize_phones(combined_df['CONTACT_PHONES'])
+        phone_lists, invalid = split_phones(combined_df['CONTACT_PHONES'])
+        combined_df['CONTACT_PHONES_LIST'] = phone_lists
+        combined_df['CONTACT_PHONES_INVALID'] = invalid
 
     # Clean email
     if 'EMAIL' in combined_df.columns:
@@ -222,12 +181,29 @@ def split_by_contact(df):
     return with_contacts, without_contacts
 
 
+def for_export(df):
+    """Join phone lists into text so Excel/CSV files get plain cells"""
+    if 'CONTACT_PHONES_LIST' in df.columns:
+        df = df.assign(CONTACT_PHONES_LIST=df['CONTACT_PHONES_LIST'].map(
+            lambda phones: ', '.join(phones) if isinstance(phones, list) else phones))
+    return df
+
+
+def get_search_index(df):
+    """Search index of the dataset, built on the first search and kept until the data changes"""
+    if st.session_state.get('search_source') is not df:
+        with st.spinner(t("processing")):
+            st.session_state.search_index = SearchIndex(df)
+        st.session_state.search_source = df
+    return st.session_state.search_index
+
+
 def create_excel_download(df_with, df_without):
     """Create Excel file with two sheets"""
     output = BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_with.to_excel(writer, sheet_name='With Contacts', index=False)
-        df_without.to_excel(writer, sheet_name='Without Contacts', index=False)
+        for_export(df_with).to_excel(writer, sheet_name='With Contacts', index=False)
+        for_export(df_without).to_excel(writer, sheet_name='Without Contacts', index=False)
 
     output.seek(0)
     return output
@@ -370,8 +346,8 @@ elif page == t("analysis"):
         # Search
         search_term = st.text_input(t("search_placeholder"))
         if search_term:
-            mask = filtered_df.apply(lambda row: search_term.lower() in str(row).lower(), axis=1)
-            filtered_df = filtered_df[mask]
+            rows = get_search_index(df).search(search_term)
+            filtered_df = filtered_df[filtered_df.index.isin(df.index[rows])]
 
         # Charts
         col1, col2 = st.columns(2)
@@ -440,7 +416,7 @@ elif page == t("analysis"):
         st.dataframe(filtered_df, use_container_width=True)
 
         # Download filtered data
-        csv = filtered_df.to_csv(index=False).encode('utf-8')
+        csv = for_export(filtered_df).to_csv(index=False).encode('utf-8')
         st.download_button(
             label="📥 Download Filtered Data",
             data=csv,
@@ -493,33 +469,8 @@ elif page == t("merge"):
                         st.error(error_msg)
                         st.stop()
 
-                    # Create matching key
-                    df_old['match_key'] = (df_old['NAME_NATIVE'].astype(str) + '_' +
-                                           df_old['SURNAME_NATIVE'].astype(str)).str.lower().str.strip()
-                    df_new['match_key'] = (df_new['NAME_NATIVE'].astype(str) + '_' +
-                                           df_new['SURNAME_NATIVE'].astype(str)).str.lower().str.strip()
-
-                    # Merge data
-                    merged = df_old.set_index('match_key')
-                    updated_count = 0
-                    added_count = 0
-
-                    for idx, row in df_new.iterrows():
-                        key = row['match_key']
-
-                        if key in merged.index:
-                            # Update existing record
-                            for col in ['EMAIL', 'CONTACT_PHONES']:
-                                if col in df_new.columns and pd.notna(row[col]):
-                                    merged.at[key, col] = row[col]
-                            updated_count += 1
-                        else:
-                            # Add new record
-                            merged = pd.concat([merged, pd.DataFrame([row]).set_index('match_key')])
-                            added_count += 1
-
-                    merged = merged.reset_index(drop=True)
-                    merged = merged.drop('match_key', axis=1, errors='ignore')
+                    # Merge data: update existing students, append new ones
+                    merged, updated_count, added_count = merge_datasets(df_old, df_new)
 
                     st.session_state.merged_data = merged
 
@@ -0,0 +1,66 @@
+"""Benchmark read_uploads: serial reading, the process pool and the upload cache
+
+Run from the alumni_project folder:  python benchmarks/ingest_benchmark.py
+Writes FILES yearly exports of ROWS students each to .xlsx in memory, then
+reads them back the way the Upload page does: cold, then again from a
+fresh UploadCache.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import MAX_WORKERS, read_uploads
+from upload_cache import UploadCache
+
+FILES = 8
+ROWS = 20_000
+
+
+def make_upload(year, n, seed):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, 10 * n, n)
+    df = pd.DataFrame({
+        'NAME_NATIVE': [f"Name{i}" for i in ids],
+        'SURNAME_NATIVE': [f"Surname{i % 997}" for i in ids],
+        'EMAIL': [f"s{i}@example.com" for i in ids],
+        'CONTACT_PHONES': [f"0555{100000 + i % 900000}" for i in ids],
+        'FACULTY': rng.choice(['Economics', 'Law', 'Engineering'], n),
+    })
+    buffer = BytesIO()
+    df.to_excel(buffer, index=False)
+    return f"students_{year}.xlsx", buffer.getvalue()
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run():
+    uploads = [make_upload(2015 + i, ROWS, i) for i in range(FILES)]
+    serial_s, (serial, _) = timed(read_uploads, uploads, max_workers=1)
+    pool_s, (pooled, errors) = timed(read_uploads, uploads)
+    assert not errors
+    assert all(a.equals(b) for a, b in zip(serial, pooled))
+
+    with tempfile.TemporaryDirectory() as path:
+        cache = UploadCache(path)
+        read_uploads(uploads, cache=cache)
+        cached_s, (cached, _) = timed(read_uploads, uploads, cache=cache)
+    assert all(a.equals(b) for a, b in zip(serial, cached))
+
+    print(f"{FILES} files x {ROWS} rows, {MAX_WORKERS} workers")
+    print(f"serial {serial_s:.2f}s, pool {pool_s:.2f}s, cached {cached_s:.3f}s")
+
+
+if __name__ == "__main__":
+    run()
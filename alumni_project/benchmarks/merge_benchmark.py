@@ -0,0 +1,98 @@
+"""Benchmark merge_datasets against the old iterrows + concat merge loop
+
+Run from the alumni_project folder:  python benchmarks/merge_benchmark.py
+The new export updates half of the old students (a tenth of them listed
+twice) and adds as many new ones as it updates. The old loop is quadratic,
+so it is only timed up to OLD_MAX_ROWS.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merge_engine import merge_datasets
+
+SIZES = [10_000, 100_000, 1_000_000]
+OLD_MAX_ROWS = 10_000
+
+
+def make_exports(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n)
+    old = pd.DataFrame({
+        'NAME_NATIVE': 'Name' + pd.Series(ids).astype(str),
+        'SURNAME_NATIVE': 'Surname' + pd.Series(ids % 997).astype(str),
+        'EMAIL': [f"s{i}@example.com" if i % 3 else None for i in ids],
+        'CONTACT_PHONES': ['0555' + str(100000 + i % 900000) for i in ids],
+        'YEAR': rng.integers(2015, 2025, n),
+    })
+    updated = rng.choice(n, n // 2, replace=False)
+    repeated = updated[: n // 10]
+    new_ids = np.concatenate([updated, repeated, np.arange(n, n + n // 2)])
+    new = pd.DataFrame({
+        'NAME_NATIVE': 'Name' + pd.Series(new_ids).astype(str),
+        'SURNAME_NATIVE': 'Surname' + pd.Series(new_ids % 997).astype(str),
+        'EMAIL': [f"new{i}@example.com" for i in new_ids],
+        'CONTACT_PHONES': [None if i % 4 == 0 else '0777' + str(100000 + i % 900000) for i in new_ids],
+        'YEAR': 2025,
+    })
+    # A student without a first name, in both exports
+    nameless = {'NAME_NATIVE': None, 'SURNAME_NATIVE': 'Nameless', 'YEAR': 2020}
+    old = pd.concat([old, pd.DataFrame([nameless])], ignore_index=True)
+    new = pd.concat([pd.DataFrame([{**nameless, 'EMAIL': 'nameless@example.com'}]), new],
+                    ignore_index=True)
+    return old, new
+
+
+def old_merge(df_old, df_new):
+    """The loop from alumni.py before merge_datasets"""
+    df_old = df_old.copy()
+    df_new = df_new.copy()
+    df_old['match_key'] = (df_old['NAME_NATIVE'].astype(str) + '_' +
+                           df_old['SURNAME_NATIVE'].astype(str)).str.lower().str.strip()
+    df_new['match_key'] = (df_new['NAME_NATIVE'].astype(str) + '_' +
+                           df_new['SURNAME_NATIVE'].astype(str)).str.lower().str.strip()
+    merged = df_old.set_index('match_key')
+    updated_count = added_count = 0
+    for idx, row in df_new.iterrows():
+        key = row['match_key']
+        if key in merged.index:
+            for col in ['EMAIL', 'CONTACT_PHONES']:
+                if col in df_new.columns and pd.notna(row[col]):
+                    merged.at[key, col] = row[col]
+            updated_count += 1
+        else:
+            merged = pd.concat([merged, pd.DataFrame([row]).set_index('match_key')])
+            added_count += 1
+    merged = merged.reset_index(drop=True).drop('match_key', axis=1, errors='ignore')
+    return merged, updated_count, added_count
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run():
+    print(f"{'rows':>9} {'old s':>9} {'new s':>9} {'updated':>9} {'added':>9}")
+    for n in SIZES:
+        old, new = make_exports(n)
+        new_s, (merged, updated, added) = timed(merge_datasets, old, new)
+        if n <= OLD_MAX_ROWS:
+            old_s, (old_merged, old_updated, old_added) = timed(old_merge, old, new)
+            assert (old_updated, old_added) == (updated, added)
+            assert len(old_merged) == len(merged)
+            old_col = f"{old_s:>9.2f}"
+        else:
+            old_col = f"{'-':>9}"
+        print(f"{n:>9} {old_col} {new_s:>9.3f} {updated:>9} {added:>9}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,74 @@
+"""Benchmark normalize_phones/split_phones against the old per-row clean_phone_number
+
+Run from the alumni_project folder:  python benchmarks/phone_benchmark.py
+Phones are generated in the formats seen in the exports (with spaces,
+brackets, a leading 0 or +996, some cells with two numbers, some empty).
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phones import normalize_phones, split_phones
+
+SIZES = [10_000, 100_000, 500_000]
+
+
+def clean_phone_number(phone):
+    """The per-cell cleaner from alumni.py before normalize_phones"""
+    if pd.isna(phone):
+        return None
+
+    phone = str(phone).strip()
+    digits = re.sub(r'\D', '', phone)
+
+    if len(digits) == 9:
+        return f"+996{digits}"
+    elif len(digits) == 10 and digits.startswith('0'):
+        return f"+996{digits[1:]}"
+    elif len(digits) == 12 and digits.startswith('996'):
+        return f"+{digits}"
+    elif len(digits) == 13 and digits.startswith('996'):
+        return f"+{digits}"
+
+    return phone
+
+
+def make_phones(n, seed=0):
+    rng = random.Random(seed)
+    formats = [
+        lambda: f"0{rng.randint(500, 999)} {rng.randint(100, 999)} {rng.randint(100, 999)}",
+        lambda: f"+996 ({rng.randint(500, 999)}) {rng.randint(10, 99)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}",
+        lambda: f"{rng.randint(500_000_000, 999_999_999)}",
+        lambda: f"0{rng.randint(500_000_000, 999_999_999)}, 0{rng.randint(500_000_000, 999_999_999)}",
+        lambda: f"{rng.randint(1000, 99999)}",
+        lambda: None,
+    ]
+    return pd.Series([rng.choice(formats)() for _ in range(n)])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run():
+    print(f"{'rows':>8} {'apply s':>9} {'normalize s':>12} {'split s':>9} {'invalid':>8}")
+    for n in SIZES:
+        phones = make_phones(n)
+        old_s, old = timed(phones.apply, clean_phone_number)
+        new_s, new = timed(normalize_phones, phones)
+        split_s, (lists, invalid) = timed(split_phones, phones)
+        assert old.fillna('').tolist() == new.fillna('').tolist()
+        print(f"{n:>8} {old_s:>9.3f} {new_s:>12.3f} {split_s:>9.3f} {int(invalid.sum()):>8}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,69 @@
+"""Benchmark SearchIndex against the old row-by-row search of the Analysis page
+
+Run from the alumni_project folder:  python benchmarks/search_benchmark.py
+Builds the index over ROWS generated students once, then times each query.
+The old search stringifies every row, so it is only timed on OLD_ROWS.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+ROWS = 500_000
+OLD_ROWS = 20_000
+QUERIES = ['Айбек', 'aibek', 'ив', 'Асанов айб', 'gmail', '0555 12', '+996 777', 'физ', 'zzz']
+
+NAMES = ['Айбек', 'Алия', 'Бакыт', 'Гүлнара', 'Нурлан', 'Айгерим', 'Эрлан', 'Жылдыз']
+SURNAMES = ['Иванов', 'Асанов', 'Токтогулова', 'Ким', 'Өмүрбеков', 'Садыкова']
+FACULTIES = ['Физика', 'Экономика', 'Право', 'ИТ']
+
+
+def make_students(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n)
+    return pd.DataFrame({
+        'NAME_NATIVE': rng.choice(NAMES, n),
+        'SURNAME_NATIVE': [f"{s}{i % 50}" for s, i in zip(rng.choice(SURNAMES, n), ids)],
+        'EMAIL': [f"student{i}@{'gmail.com' if i % 2 else 'mail.ru'}" for i in ids],
+        'CONTACT_PHONES_CLEANED': [f"+996{rng_num}" for rng_num in rng.integers(500_000_000, 999_999_999, n)],
+        'SPEC_RU': rng.choice(FACULTIES, n),
+        'YEAR': rng.integers(2015, 2025, n),
+    })
+
+
+def old_search(df, search_term):
+    """The search from alumni.py before SearchIndex"""
+    return df[df.apply(lambda row: search_term.lower() in str(row).lower(), axis=1)]
+
+
+def run():
+    df = make_students(ROWS)
+    start = time.perf_counter()
+    index = SearchIndex(df)
+    print(f"{ROWS} rows, index built in {time.perf_counter() - start:.2f}s, "
+          f"{len(index.vocab)} tokens")
+
+    start = time.perf_counter()
+    old_search(df.head(OLD_ROWS), QUERIES[0])
+    print(f"old search over {OLD_ROWS} rows: {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':>14} {'rows':>8} {'ms':>8}")
+    for query in QUERIES:
+        index.search(query)
+        start = time.perf_counter()
+        repeats = 20
+        for _ in range(repeats):
+            rows = index.search(query)
+        ms = (time.perf_counter() - start) / repeats * 1000
+        print(f"{query:>14} {len(rows):>8} {ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    run()
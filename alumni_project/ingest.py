@@ -0,0 +1,138 @@
+"""Parallel reading of uploaded Excel files"""
+
+import importlib
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+
+from upload_cache import upload_key
+
+MAX_WORKERS = int(os.environ.get("ALUMNI_INGEST_WORKERS", min(4, os.cpu_count() or 1)))
+# What read_excel uses for .xlsx and .xls files
+EXCEL_ENGINES = ['openpyxl', 'xlrd']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def extract_year_from_filename(filename):
+    """Extract all years from filename (e.g., 2023_2024)"""
+    matches = re.findall(r'20\d{2}', filename)
+    if matches:
+        # Return the first year found
+        return int(matches[0])
+    return datetime.now().year
+
+
+def read_upload(name, data):
+    """Read one Excel file and fill its YEAR column; runs in a worker process"""
+    try:
+        # Read Excel file (handles both .xls and .xlsx)
+        df = pd.read_excel(BytesIO(data), engine=None)
+
+        # Priority 1: Check if YEAR column exists in the data
+        if 'YEAR' not in df.columns:
+            # Priority 2: Extract year from filename
+            df['YEAR'] = extract_year_from_filename(name)
+        else:
+            # YEAR column exists, but fill missing values from filename
+            df['YEAR'] = df['YEAR'].fillna(extract_year_from_filename(name))
+
+        # Convert YEAR to integer
+        df['YEAR'] = df['YEAR'].astype(int)
+        return df, None
+    except Exception as e:
+        return None, str(e)
+
+
+def _pool_context():
+    """Workers are forked: Streamlit runs the app script as __main__, so
+    spawned workers would re-run the whole app on start-up"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _get_pool():
+    """The process-wide worker pool, created on first use, or None.
+
+    Forking a threaded server is safe here because the workers only ever run
+    read_upload: pandas and the Excel engines are imported before the fork,
+    so a worker imports nothing, and it never touches Streamlit state or the
+    locks of the server's threads. The pool forks all of its workers once,
+    on the first upload, and keeps them for later uploads.
+    """
+    global _pool
+    context = _pool_context()
+    if context is None or MAX_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            for engine in EXCEL_ENGINES:
+                importlib.import_module(engine)
+            _pool = ProcessPoolExecutor(MAX_WORKERS, mp_context=context)
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a pool whose worker died, so the next upload forks a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def read_uploads(uploads, max_workers=MAX_WORKERS, cache=None):
+    """Read (name, bytes) pairs concurrently.
+
+    Returns (frames, errors): the frames of the files that could be read, in
+    upload order, and a (file name, message) pair for every file that
+    couldn't. With an UploadCache, files read before are loaded from it and
+    only the rest are parsed.
+    """
+    uploads = list(uploads)
+    names = [name for name, _ in uploads]
+    results = [None] * len(uploads)
+    keys = [None] * len(uploads)
+
+    if cache is not None:
+        for i, (name, data) in enumerate(uploads):
+            keys[i] = upload_key(data, extract_year_from_filename(name))
+            df = cache.get(keys[i])
+            if df is not None:
+                results[i] = df, None
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    pool = _get_pool() if min(max_workers, len(missing)) > 1 else None
+
+    parsed = None
+    if pool is not None:
+        try:
+            parsed = list(pool.map(read_upload,
+                                   [names[i] for i in missing],
+                                   [uploads[i][1] for i in missing]))
+        except BrokenProcessPool:
+            _discard_pool(pool)
+    if parsed is None:
+        parsed = [read_upload(*uploads[i]) for i in missing]
+
+    for i, (df, error) in zip(missing, parsed):
+        results[i] = df, error
+        if cache is not None and error is None:
+            cache.put(keys[i], df)
+
+    frames, errors = [], []
+    for name, (df, error) in zip(names, results):
+        if error is None:
+            frames.append(df)
+        else:
+            errors.append((name, error))
+    return frames, errors
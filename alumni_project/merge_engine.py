@@ -0,0 +1,78 @@
+"""Keyed merge of an old and a new student export"""
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ['NAME_NATIVE', 'SURNAME_NATIVE']
+UPDATE_COLUMNS = ['EMAIL', 'CONTACT_PHONES']
+
+
+def make_match_key(df):
+    """Build the name_surname key used to match students across exports.
+
+    Blank cells count as empty text, so a missing name never makes the whole
+    key missing (pandas 3 keeps NaN through astype(str)).
+    """
+    name = df['NAME_NATIVE'].fillna('').astype(str)
+    surname = df['SURNAME_NATIVE'].fillna('').astype(str)
+    return (name + '_' + surname).str.lower().str.strip()
+
+
+def merge_datasets(df_old, df_new, update_columns=UPDATE_COLUMNS):
+    """Update existing students and append new ones in one keyed join.
+
+    Students of the new file that are already in the old one get their
+    update_columns overwritten with the new non-empty values (every old row
+    with that key). Students not in the old file are appended once, in the
+    order they first appear. When a key repeats in the new file, the last
+    non-empty value of each update column wins. Each new row counts once,
+    either as added (first row of a new key) or as updated (all others).
+
+    Returns (merged, updated_count, added_count).
+    """
+    df_old = df_old.drop(columns='match_key', errors='ignore').reset_index(drop=True)
+    df_new = df_new.drop(columns='match_key', errors='ignore').reset_index(drop=True)
+
+    # Hash both key columns into one code space; the join below works on ints.
+    codes, uniques = pd.concat([make_match_key(df_old), make_match_key(df_new)],
+                               ignore_index=True).factorize()
+    old_codes, new_codes = codes[:len(df_old)], codes[len(df_old):]
+
+    in_old = np.zeros(len(uniques), dtype=bool)
+    in_old[old_codes] = True
+    added_mask = ~pd.Series(new_codes).duplicated().to_numpy() & ~in_old[new_codes]
+    added_count = int(added_mask.sum())
+    updated_count = len(df_new) - added_count
+
+    columns = [col for col in update_columns if col in df_new.columns]
+    # Last non-empty value per key (groupby.last skips missing values).
+    latest = df_new[columns].groupby(new_codes, sort=False).last()
+
+    merged_old = df_old.copy()
+    in_new = np.zeros(len(uniques), dtype=bool)
+    in_new[new_codes] = True
+    matched = in_new[old_codes]
+    if columns and matched.any():
+        aligned = latest.reindex(old_codes[matched])
+        rows = np.flatnonzero(matched)
+        for col in columns:
+            values = aligned[col].to_numpy(dtype=object)
+            present = pd.notna(values)
+            # Object arrays, so e.g. text can land in an all-empty float column.
+            if col in merged_old.columns:
+                current = merged_old[col].to_numpy(dtype=object, copy=True)
+            else:
+                current = np.full(len(merged_old), np.nan, dtype=object)
+            current[rows[present]] = values[present]
+            merged_old[col] = pd.Series(current, index=merged_old.index).infer_objects()
+
+    added = df_new[added_mask].copy()
+    if not len(added):
+        return merged_old, updated_count, added_count
+    if columns:
+        aligned = latest.reindex(new_codes[added_mask])
+        for col in columns:
+            added[col] = aligned[col].to_numpy()
+
+    merged = pd.concat([merged_old, added], ignore_index=True)
+    return merged, updated_count, added_count
@@ -0,0 +1,69 @@
+"""Vectorized phone number cleaning for the CONTACT_PHONES column"""
+
+import numpy as np
+import pandas as pd
+
+# Cells like "0555 123 456, 0777 654 321" or "0555123456; +996 777 65 43 21"
+SEPARATORS = r'[,;/\n]+'
+VALID_PATTERN = r'^\+996\d{9}$'
+
+
+def normalize_phones(phones):
+    """Standardize phone numbers to +996XXXXXXXXX format, a whole column at once.
+
+    Same rules as the old per-cell clean_phone_number: all digits of the cell
+    are taken together, 9 digits get +996, a leading 0 of 10 digits becomes
+    +996, 12/13 digits starting with 996 get a +, anything else is returned
+    stripped but unchanged. Missing cells stay None.
+    """
+    present = phones.notna().to_numpy()
+    result = np.full(len(phones), None, dtype=object)
+    if present.any():
+        result[present] = _normalize(phones[present].astype(str)).to_numpy(dtype=object)
+    return pd.Series(result, index=phones.index, dtype=object)
+
+
+def _normalize(text):
+    """normalize_phones for a column of non-missing strings"""
+    text = text.str.strip()
+    digits = text.str.replace(r'\D', '', regex=True)
+    length = digits.str.len()
+
+    cleaned = text.mask(((length == 12) | (length == 13)) & digits.str.startswith('996'), '+' + digits)
+    cleaned = cleaned.mask((length == 10) & digits.str.startswith('0'), '+996' + digits.str[1:])
+    return cleaned.mask(length == 9, '+996' + digits)
+
+
+def split_phones(phones):
+    """Split multi-number cells and normalize each number.
+
+    Returns (lists, invalid): per cell, the list of valid +996XXXXXXXXX
+    numbers, and True where a cell holds a number that couldn't be
+    normalized to that format.
+    """
+    text = phones.reset_index(drop=True).dropna().astype(str)
+    # Only cells with a separator need the (slow) regex split.
+    multi = text.str.contains(SEPARATORS, regex=True).to_numpy()
+    parts = pd.concat([
+        text[~multi],
+        text[multi].str.split(SEPARATORS, regex=True).explode(),
+    ]).sort_index(kind='stable')
+    parts = parts[parts.str.strip() != '']
+
+    cleaned = _normalize(parts)
+    valid = cleaned.str.fullmatch(VALID_PATTERN).to_numpy(dtype=bool)
+    rows = parts.index.to_numpy()
+
+    invalid = np.zeros(len(phones), dtype=bool)
+    invalid[rows[~valid]] = True
+
+    lists = [[] for _ in range(len(phones))]
+    good_rows, good = rows[valid], cleaned.to_numpy(dtype=object)[valid]
+    # Parts of one cell are adjacent, so each run of equal rows is one list.
+    starts = np.flatnonzero(np.r_[len(good_rows) > 0, good_rows[1:] != good_rows[:-1]])
+    ends = np.r_[starts[1:], len(good_rows)]
+    for row, start, end in zip(good_rows[starts], starts, ends):
+        lists[row] = good[start:end].tolist()
+
+    return (pd.Series(lists, index=phones.index, dtype=object),
+            pd.Series(invalid, index=phones.index))
@@ -0,0 +1,148 @@
+"""Token index for the Analysis page search box"""
+
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SEARCH_COLUMNS = ['NAME_NATIVE', 'SURNAME_NATIVE', 'EMAIL',
+                  'CONTACT_PHONES', 'CONTACT_PHONES_CLEANED', 'SPEC_RU']
+
+TOKEN_PATTERN = r'\w+'
+# TOKEN_PATTERN's complement in Arrow's regex syntax, where \w is ASCII only;
+# always run through pyarrow.compute, whatever string dtype pandas uses
+SEPARATORS = r'[^\p{L}\p{N}\p{M}_]+'
+# "0555 12-34-56" and "(0555) 123456" are one number
+DIGIT_GAPS = r'(?<=\d)[\s\-()]+(?=\d)'
+
+# Russian and Kyrgyz letters, so "aibek" finds "Айбек"
+TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'ң': 'n', 'о': 'o', 'ө': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'u', 'ү': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya',
+})
+
+# Sorts after every token that starts with a given prefix
+PREFIX_END = '\U0010ffff'
+
+
+def _fold(text):
+    """NFKC, case-folded, Cyrillic spelled in Latin"""
+    return unicodedata.normalize('NFKC', text).casefold().translate(TRANSLIT)
+
+
+def _map(func, text):
+    """func over each string of text, in Python"""
+    return pd.Series([func(value) for value in text], index=text.index, dtype='str')
+
+
+def _arrow(text):
+    """text as an Arrow string array, whichever string dtype pandas gave it"""
+    return pa.array(text.to_numpy(dtype=object), type=pa.string())
+
+
+def _matches(text, pattern):
+    """Boolean mask of the strings of text that pattern (Arrow syntax) finds"""
+    return pc.match_substring_regex(_arrow(text), pattern).to_numpy(zero_copy_only=False)
+
+
+def _cell_tokens(values):
+    """Tokens of each distinct cell value, as a Series indexed by value position"""
+    text = pd.Series(values, dtype='str')
+    gaps = _matches(text, r'\d[\s\-()]+\d')
+    text = text.mask(gaps, _map(lambda value: re.sub(DIGIT_GAPS, '', value), text[gaps]))
+    # Python-level folding only where plain lowercasing isn't enough
+    other = _matches(text, r'[^\x00-\x7f]')
+    folded = text.str.lower()
+    folded = folded.mask(other, _map(_fold, text[other]))
+
+    separated = pc.replace_substring_regex(_arrow(folded), SEPARATORS, ' ')
+    words = pc.split_pattern(separated, ' ')
+    tokens = pd.Series(pc.list_flatten(words), dtype='str',
+                       index=pc.list_parent_indices(words).to_numpy())
+    tokens = tokens[tokens.notna() & (tokens != '')]
+
+    # +996 555 123 456 is also typed as 0555123456 or 555123456
+    local = tokens[_matches(tokens, r'^(?:996|0)\d{9}$')].str[-9:]
+    return pd.concat([tokens, local, '0' + local, '996' + local])
+
+
+def _rows_by_value(codes):
+    """Row positions grouped by value code, and where each group starts"""
+    rows = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=codes.max() + 1 if len(codes) else 0)
+    starts = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+    return rows, starts, counts
+
+
+class SearchIndex:
+    """Rows by token, for prefix search over SEARCH_COLUMNS of one dataset.
+
+    Tokens are NFKC-normalized, case-folded and spelled in Latin, so "Айбек",
+    "айб" and "aibek" meet. The vocabulary is sorted and the rows of each
+    token are stored one after another in that order, so all tokens sharing
+    a prefix are one slice.
+    """
+
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        self.size = len(df)
+        token_parts, row_parts = [], []
+        for col in columns:
+            if col not in df.columns:
+                continue
+            codes, values = pd.factorize(df[col].astype(str).where(df[col].notna()))
+            if not len(values):
+                continue
+            tokens = _cell_tokens(values)
+
+            # Every row holding a value gets all tokens of that value
+            rows, starts, counts = _rows_by_value(codes)
+            value_ids = tokens.index.to_numpy()
+            repeats = counts[value_ids]
+            first = np.repeat(starts[value_ids] - np.cumsum(repeats) + repeats, repeats)
+            row_parts.append(rows[first + np.arange(len(first))])
+            token_parts.append(np.repeat(tokens.to_numpy(), repeats))
+
+        all_tokens = pd.Series(np.concatenate(token_parts) if token_parts else [], dtype='str')
+        token_ids, vocab = pd.factorize(all_tokens, sort=True)
+        self.vocab = vocab.tolist()
+        rows = np.concatenate(row_parts) if row_parts else np.array([], dtype=np.int64)
+
+        # One entry per (token, row), grouped by token
+        n = max(self.size, 1)
+        pairs = np.sort(token_ids.astype(np.int64) * n + rows)
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        self.rows = pairs % n
+        self.offsets = np.searchsorted(pairs // n, np.arange(len(self.vocab) + 1))
+
+    def _prefix(self, prefix):
+        """Rows of all tokens starting with prefix, and how many tokens that is"""
+        lo = bisect.bisect_left(self.vocab, prefix)
+        hi = bisect.bisect_left(self.vocab, prefix + PREFIX_END, lo)
+        return self.rows[self.offsets[lo]:self.offsets[hi]], hi - lo
+
+    def search(self, query):
+        """Sorted positions of the rows where every word of query starts a token"""
+        words = re.findall(TOKEN_PATTERN, _fold(re.sub(DIGIT_GAPS, '', query)))
+        if not words:
+            return np.arange(self.size)
+
+        if len(words) == 1:
+            rows, tokens = self._prefix(words[0])
+            # One token's rows are already sorted and distinct
+            if tokens <= 1:
+                return rows
+
+        found = np.ones(self.size, dtype=bool)
+        for word in words:
+            hits = np.zeros(self.size, dtype=bool)
+            hits[self._prefix(word)[0]] = True
+            found &= hits
+        return np.flatnonzero(found)
@@ -0,0 +1,92 @@
+"""On-disk cache of parsed uploads, stored as Feather files"""
+
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+CACHE_DIR = os.environ.get(
+    "ALUMNI_UPLOAD_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "upload_cache"))
+MAX_BYTES = int(os.environ.get("ALUMNI_UPLOAD_CACHE_MB", "512")) * 1024 * 1024
+SUFFIX = ".feather"
+
+
+def upload_key(data, year):
+    """Cache key of one upload: its content hash and the YEAR its file name gives"""
+    return f"{hashlib.sha256(data).hexdigest()}_{year}"
+
+
+class UploadCache:
+    """Parsed frames by upload key, least recently used evicted past max_bytes.
+
+    A file's modification time is its last use; hits touch it.
+    """
+
+    def __init__(self, path=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + SUFFIX)
+
+    def get(self, key):
+        """Cached frame for key, or None"""
+        file = self._file(key)
+        try:
+            df = pd.read_feather(file)
+            os.utime(file)
+        except (OSError, ValueError):
+            return None
+        return df
+
+    def put(self, key, df):
+        """Store df under key, then evict down to max_bytes"""
+        file = self._file(key)
+        tmp = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_feather(tmp)
+            os.replace(tmp, file)
+        except Exception:
+            # Columns Arrow can't store (e.g. numbers and text mixed in one
+            # column) just aren't cached.
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.path):
+                if not name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+                total -= size
+
+
+_cache = None
+
+
+def get_upload_cache():
+    """The process-wide UploadCache"""
+    global _cache
+    if _cache is None:
+        _cache = UploadCache()
+    return _cache
@@ -1,26 +1,11 @@
 # admin_panel.py – Admin tools for managing users
 
 import streamlit as st
-from pyairtable import Table
-from pyairtable.formulas import match
-
-USER_TABLE = Table(
-    'patO49KbikvJl3JCT.bcc975992a1f9821a40d6341ffc296bbef4eb9f19c0fb1811e4e159f7de223ea',
-    'appdgbGbEz1Dtynvg',
-    'users_data'
-)
-
-WARDROBE_TABLE = Table(
-    'patO49KbikvJl3JCT.bcc975992a1f9821a40d6341ffc296bbef4eb9f19c0fb1811e4e159f7de223ea',
-    'appdgbGbEz1Dtynvg',
-    'wardrobe_data'
-)
-
-COMBINATIONS_TABLE = Table(
-    'patO49KbikvJl3JCT.bcc975992a1f9821a40d6341ffc296bbef4eb9f19c0fb1811e4e159f7de223ea',
-    'appdgbGbEz1Dtynvg',
-    'combinations_data'
-)
+from bulk_delete import start_user_deletion, run_job, pending_jobs
+from airtable_utils import WRITE_QUEUE
+from request_scheduler import get_scheduler
+from stats_store import STATS
+from storage import USERS, STORAGE_BACKEND, AIRTABLE_BASE_ID
 
 def admin_panel():
     st.title("🔧 Admin Panel")
@@ -29,15 +14,15 @@ def admin_panel():
         st.error("Access denied. Admins only.")
         st.stop()
 
-    st.subheader("📋 Registered Users")
-    users = USER_TABLE.all()
-    from airtable_utils import WARDROBE_TABLE, COMBINATIONS_TABLE
+    _resume_section()
+    _scheduler_section()
+    _write_queue_section()
 
-    wardrobe = WARDROBE_TABLE.all()
-    combos = COMBINATIONS_TABLE.all()
+    st.subheader("📋 Registered Users")
+    users, = STATS.fetch_with(USERS)
 
-    st.metric("👕 Total Clothing Items", len(wardrobe))
-    st.metric("👗 Total Outfit Combinations", len(combos))
+    st.metric("👕 Total Clothing Items", STATS.item_count())
+    st.metric("👗 Total Outfit Combinations", STATS.combo_count())
 
     emails = [u['fields'].get('Email') for u in users]
     selected_email = st.selectbox("Select a user to manage", emails)
@@ -50,26 +35,70 @@ def admin_panel():
         st.write("**Airtable ID:**", selected_user['id'])
 
         user_email = selected_user['fields'].get('Email')
-        user_wardrobe_count = sum(1 for item in wardrobe if item['fields'].get('User_Email') == user_email)
-        user_combo_count = sum(1 for c in combos if c['fields'].get('User_Email') == user_email)
+        user_wardrobe_count = STATS.item_count(user_email)
+        user_combo_count = STATS.combo_count(user_email)
 
         st.write(f"**Clothes by this user:** {user_wardrobe_count}")
         st.write(f"**Combinations by this user:** {user_combo_count}")
 
         if st.button("❌ Delete this user and all data"):
             try:
-                wardrobe = WARDROBE_TABLE.all()
-                for item in wardrobe:
-                    if item['fields'].get('User_Email') == selected_email:
-                        WARDROBE_TABLE.delete(item['id'])
+                job = start_user_deletion(selected_email, selected_user['id'])
+                _run_deletion(job)
+                st.success("User and all associated data deleted.")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Failed to delete user: {e}")
+
 
-                combos = COMBINATIONS_TABLE.all()
-                for combo in combos:
-                    if combo['fields'].get('User_Email') == selected_email:
-                        COMBINATIONS_TABLE.delete(combo['id'])
+def _run_deletion(job):
+    progress = st.progress(0.0, text=f"Deleting data of {job['email']}...")
 
-                USER_TABLE.delete(selected_user['id'])
+    def on_progress(done, total):
+        progress.progress(done / total if total else 1.0, text=f"Deleted {done}/{total} records")
+
+    run_job(job, on_progress)
+    progress.progress(1.0, text="Done")
+
+
+def _resume_section():
+    jobs = pending_jobs()
+    if not jobs:
+        return
+    st.subheader("⏳ Unfinished Deletions")
+    for job in jobs:
+        st.write(f"**{job['email']}** – {job['done']}/{job['total']} records deleted")
+        if st.button("Resume", key=f"resume_{job['email']}"):
+            try:
+                _run_deletion(job)
                 st.success("User and all associated data deleted.")
                 st.rerun()
             except Exception as e:
                 st.error(f"Failed to delete user: {e}")
+
+
+def _scheduler_section():
+    if STORAGE_BACKEND != "airtable":
+        return
+    metrics = get_scheduler(AIRTABLE_BASE_ID).metrics()
+    with st.expander("📡 Airtable Requests"):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Queue Depth", metrics['queue_depth'])
+        col2.metric("In Flight", metrics['in_flight'])
+        col3.metric("Retries", metrics['retries'])
+        col1.metric("Completed", metrics['completed'])
+        col2.metric("Avg Wait", f"{metrics['avg_wait']:.2f}s")
+        col3.metric("Max Wait", f"{metrics['max_wait']:.2f}s")
+        if metrics['failed']:
+            st.warning(f"{metrics['failed']} requests failed after retries")
+
+
+def _write_queue_section():
+    pending = WRITE_QUEUE.pending()
+    failed = WRITE_QUEUE.failed()
+    if pending:
+        st.info(f"⏳ {len(pending)} new records waiting to be written")
+    if failed:
+        with st.expander(f"⚠️ {len(failed)} records could not be written"):
+            for entry in failed:
+                st.write(f"**{entry['table']}** – {entry['record']['fields']} – {entry['error']}")
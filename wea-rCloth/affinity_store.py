@@ -0,0 +1,258 @@
+# affinity_store.py – running rating averages for every pair of a user's items
+#
+# Each user gets a dense item × item matrix of rating sums and counts; the
+# diagonal holds per-item totals. A new rating touches a handful of cells,
+# so the store is updated in O(1) instead of being rebuilt from
+# combinations_data. On disk a rating is one line appended to the user's
+# delta log; every SNAPSHOT_EVERY ratings a background thread writes the
+# matrix as a snapshot and trims the log. Log entries carry sequence numbers
+# and the snapshot records the last one it includes, so loading replays
+# exactly the ratings the snapshot is missing.
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+import numpy as np
+
+AFFINITY_DIR = "affinity"
+PARTS = ['Upper_Body', 'Lower_Body', 'Footwear']
+# Pseudo-ratings at the overall mean added to every average, so an item
+# rated once doesn't outrank one rated well many times.
+PRIOR_WEIGHT = 3
+FAVORITE_BONUS = 1.0
+SNAPSHOT_EVERY = 50
+
+
+def effective_rating(combo):
+    rating = combo.get('Rating')
+    if rating is None or rating != rating:
+        return None
+    return float(rating) + (FAVORITE_BONUS if combo.get('Favorite') is True else 0.0)
+
+
+class AffinityMatrix:
+    def __init__(self, models=(), sums=None, counts=None, total=0.0, n_ratings=0, seq=0):
+        self.models = list(models)
+        self.index = {m: i for i, m in enumerate(self.models)}
+        capacity = max(8, len(self.models))
+        self.sums = np.zeros((capacity, capacity))
+        self.counts = np.zeros((capacity, capacity), dtype=np.int32)
+        if sums is not None:
+            n = len(self.models)
+            self.sums[:n, :n] = sums
+            self.counts[:n, :n] = counts
+        self.total = float(total)
+        self.n_ratings = int(n_ratings)
+        # Last delta-log entry applied, and the last one in the snapshot.
+        self.seq = self.saved_seq = int(seq)
+
+    def _slot(self, model):
+        if model not in self.index:
+            n = len(self.models)
+            if n == len(self.sums):
+                grown = 2 * n
+                sums = np.zeros((grown, grown))
+                counts = np.zeros((grown, grown), dtype=np.int32)
+                sums[:n, :n] = self.sums
+                counts[:n, :n] = self.counts
+                self.sums, self.counts = sums, counts
+            self.index[model] = n
+            self.models.append(model)
+        return self.index[model]
+
+    def add(self, combo):
+        rating = effective_rating(combo)
+        models = [combo.get(part) for part in PARTS]
+        if rating is None or not all(models):
+            return False
+        slots = [self._slot(m) for m in models]
+        for i in slots:
+            self.sums[i, i] += rating
+            self.counts[i, i] += 1
+        for i, j in combinations(slots, 2):
+            self.sums[i, j] += rating
+            self.sums[j, i] += rating
+            self.counts[i, j] += 1
+            self.counts[j, i] += 1
+        self.total += rating
+        self.n_ratings += 1
+        return True
+
+    @property
+    def global_mean(self):
+        return self.total / self.n_ratings if self.n_ratings else 0.0
+
+    def _slots(self, models):
+        return np.array([self.index.get(m, -1) for m in models], dtype=np.int64)
+
+    def _smoothed(self, sums, counts, expected):
+        return (sums + PRIOR_WEIGHT * expected) / (counts + PRIOR_WEIGHT)
+
+    def item_scores(self, models):
+        slots = self._slots(models)
+        known = slots >= 0
+        scores = np.zeros(len(slots))
+        if known.any():
+            s = slots[known]
+            mean = self.global_mean
+            scores[known] = self._smoothed(self.sums[s, s], self.counts[s, s], mean) - mean
+        return scores
+
+    def pair_scores(self, rows, cols):
+        r, c = self._slots(rows), self._slots(cols)
+        scores = np.zeros((len(r), len(c)))
+        rk, ck = np.flatnonzero(r >= 0), np.flatnonzero(c >= 0)
+        if len(rk) and len(ck):
+            ri, ci = r[rk], c[ck]
+            expected = (
+                self.global_mean
+                + self.item_scores(np.array(rows, dtype=object)[rk])[:, None]
+                + self.item_scores(np.array(cols, dtype=object)[ck])[None, :]
+            )
+            sums = self.sums[np.ix_(ri, ci)]
+            counts = self.counts[np.ix_(ri, ci)]
+            scores[np.ix_(rk, ck)] = np.where(
+                counts > 0, self._smoothed(sums, counts, expected) - expected, 0.0
+            )
+        return scores
+
+    def best_partners(self, model, n=5):
+        i = self.index.get(model)
+        if i is None:
+            return []
+        size = len(self.models)
+        counts = self.counts[i, :size].copy()
+        counts[i] = 0
+        partners = np.flatnonzero(counts)
+        means = self.sums[i, partners] / counts[partners]
+        order = np.argsort(-means)[:n]
+        return [(self.models[partners[k]], float(means[k]), int(counts[partners[k]])) for k in order]
+
+    def snapshot(self):
+        # A copy of the state that can be saved without holding the store lock.
+        n = len(self.models)
+        return AffinityMatrix(
+            self.models, self.sums[:n, :n], self.counts[:n, :n], self.total, self.n_ratings, self.seq
+        )
+
+    def save(self, path):
+        n = len(self.models)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp, models=np.array(self.models, dtype=str),
+            sums=self.sums[:n, :n], counts=self.counts[:n, :n],
+            total=np.array(self.total), n_ratings=np.array(self.n_ratings),
+            seq=np.array(self.seq)
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['models'].tolist(), data['sums'], data['counts'],
+                data['total'].item(), data['n_ratings'].item(),
+                data['seq'].item() if 'seq' in data else 0
+            )
+
+
+_matrices = {}
+_lock = threading.Lock()
+# One thread writes snapshots, so they never run on a request thread and
+# never race each other.
+_snapshots = ThreadPoolExecutor(max_workers=1, thread_name_prefix="affinity-snapshot")
+
+def _path(email):
+    digest = hashlib.sha1(email.lower().encode()).hexdigest()[:16]
+    return os.path.join(AFFINITY_DIR, f"{digest}.npz")
+
+def _log_path(email):
+    return _path(email)[:-len(".npz")] + ".log"
+
+def _read_log(email):
+    entries = []
+    if os.path.exists(_log_path(email)):
+        with open(_log_path(email)) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+    return entries
+
+def _snapshot(email, matrix):
+    with _lock:
+        if _matrices.get(email) is not matrix:
+            return  # forgotten meanwhile
+        copy = matrix.snapshot()
+    os.makedirs(AFFINITY_DIR, exist_ok=True)
+    copy.save(_path(email))
+    with _lock:
+        if _matrices.get(email) is not matrix:
+            if os.path.exists(_path(email)):
+                os.remove(_path(email))
+            return
+        matrix.saved_seq = copy.seq
+        # Only entries the snapshot doesn't include stay in the log.
+        rest = [entry for entry in _read_log(email) if entry['seq'] > copy.seq]
+        tmp = _log_path(email) + ".tmp"
+        with open(tmp, "w") as f:
+            for entry in rest:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, _log_path(email))
+
+def _load(email):
+    if email not in _matrices and os.path.exists(_path(email)):
+        matrix = AffinityMatrix.load(_path(email))
+        for entry in _read_log(email):
+            if entry['seq'] > matrix.seq:
+                matrix.add(entry['combo'])
+                matrix.seq = entry['seq']
+        _matrices[email] = matrix
+    return _matrices.get(email)
+
+def get_affinity(email, combinations_df=None):
+    with _lock:
+        matrix = _load(email)
+        if matrix is None:
+            matrix = AffinityMatrix()
+            if combinations_df is not None and not combinations_df.empty:
+                if 'User_Email' in combinations_df.columns:
+                    combinations_df = combinations_df[combinations_df['User_Email'] == email]
+                for combo in combinations_df.to_dict('records'):
+                    matrix.add(combo)
+            # A log without a snapshot is already part of combinations_df.
+            if os.path.exists(_log_path(email)):
+                os.remove(_log_path(email))
+            _matrices[email] = matrix
+            _snapshots.submit(_snapshot, email, matrix)
+        return matrix
+
+def record_combination(email, combo):
+    with _lock:
+        matrix = _load(email)
+        # Without a matrix the next get_affinity() builds one that already
+        # includes this combination.
+        if matrix is None or not matrix.add(combo):
+            return
+        matrix.seq += 1
+        logged = {part: str(combo[part]) for part in PARTS}
+        logged.update(Rating=float(combo['Rating']), Favorite=combo.get('Favorite') is True)
+        entry = {'seq': matrix.seq, 'combo': logged}
+        os.makedirs(AFFINITY_DIR, exist_ok=True)
+        with open(_log_path(email), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        # A snapshot that failed is retried SNAPSHOT_EVERY ratings later.
+        if (matrix.seq - matrix.saved_seq) % SNAPSHOT_EVERY == 0:
+            _snapshots.submit(_snapshot, email, matrix)
+
+def forget_affinity(email):
+    with _lock:
+        _matrices.pop(email, None)
+        for path in (_path(email), _log_path(email)):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,25 +1,252 @@
 # airtable_utils.py
 
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
 import pandas as pd
-from pyairtable import Table
 import streamlit as st
 
-WARDROBE_TABLE = Table(
-    'patO49KbikvJl3JCT.bcc975992a1f9821a40d6341ffc296bbef4eb9f19c0fb1811e4e159f7de223ea',
-    'appdgbGbEz1Dtynvg',
-    'wardrobe_data'
-)
+from storage import get_table, fetch_many, field_contains, WARDROBE, COMBINATIONS
+from wardrobe_helpers import add_mask_columns
+from affinity_store import record_combination
+from stats_store import STATS
+from write_behind import WriteBehindQueue, JOURNAL_PATH
+
+WARDROBE_TABLE = get_table(WARDROBE)
+COMBINATIONS_TABLE = get_table(COMBINATIONS)
+
+# Reruns within this many seconds reuse the snapshot without asking the backend.
+SYNC_INTERVAL = 5
+# A full reload every few minutes picks up deletions made by other processes.
+FULL_RESYNC_INTERVAL = 300
+# The modified-time cursor is moved back a little to absorb clock skew.
+SYNC_OVERLAP = timedelta(seconds=5)
+# Per-user / per-filter views kept in memory before the oldest is dropped.
+MAX_VIEWS = 256
+
+# Versions come from one process-wide counter, so a view that is evicted and
+# created again never repeats a (user, version) key of the frame and chart
+# caches.
+_versions = itertools.count(1)
+
+
+class TableCache:
+    # Process-wide snapshot of a table (or a filtered view of it), shared by
+    # every session. The filter is pushed down to the storage backend.
+
+    def __init__(self, table, equals=None, contains=None):
+        self.table = table
+        self.equals = dict(equals or {})
+        self.contains = dict(contains or {})
+        self.version = next(_versions)
+        self._records = {}
+        self._cursor = None
+        self._last_sync = 0.0
+        self._last_full_sync = 0.0
+        self._lock = threading.Lock()
+
+    def matches(self, record):
+        fields = record.get('fields', {})
+        return (
+            all(fields.get(f) == v for f, v in self.equals.items()) and
+            all(field_contains(fields.get(f), v) for f, v in self.contains.items())
+        )
+
+    def needs_full_sync(self):
+        return self._cursor is None or time.monotonic() - self._last_full_sync > FULL_RESYNC_INTERVAL
+
+    def predicates(self):
+        return {'equals': self.equals, 'contains': self.contains}
+
+    def records(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.needs_full_sync():
+                self._full_sync(now)
+            elif now - self._last_sync > SYNC_INTERVAL:
+                self._incremental_sync(now)
+            return list(self._records.values())
+
+    def _fetch(self, modified_after=None):
+        return self.table.all(
+            equals=self.equals, contains=self.contains, modified_after=modified_after
+        )
+
+    def _full_sync(self, now):
+        started = datetime.now(timezone.utc)
+        self._install(self._fetch(), started, now)
+
+    def _install(self, records, started, now):
+        self._records = {rec['id']: rec for rec in records}
+        # Creates still in the write-behind queue aren't in the backend yet.
+        for rec in WRITE_QUEUE.pending(self.table.name):
+            if self.matches(rec):
+                self._records[rec['id']] = rec
+        self._cursor = started - SYNC_OVERLAP
+        self._last_sync = self._last_full_sync = now
+        self.version = next(_versions)
+
+    def install(self, records, started):
+        with self._lock:
+            self._install(records, started, time.monotonic())
+
+    def _incremental_sync(self, now):
+        started = datetime.now(timezone.utc)
+        changed = self._fetch(modified_after=self._cursor)
+        for rec in changed:
+            if self._records.get(rec['id']) != rec:
+                self._records[rec['id']] = rec
+                self.version = next(_versions)
+        self._cursor = started - SYNC_OVERLAP
+        self._last_sync = now
+
+    def upsert(self, record):
+        with self._lock:
+            if self.matches(record):
+                self._records[record['id']] = record
+                self.version = next(_versions)
+            elif self._records.pop(record['id'], None) is not None:
+                self.version = next(_versions)
+
+    def remove(self, record_id):
+        with self._lock:
+            if self._records.pop(record_id, None) is not None:
+                self.version = next(_versions)
+
+    def invalidate(self):
+        with self._lock:
+            self._cursor = None
+
+
+_views_lock = threading.Lock()
+_views = OrderedDict()
+
+def get_view(table, equals=None, contains=None):
+    key = (
+        table.name,
+        tuple(sorted((equals or {}).items())),
+        tuple(sorted((contains or {}).items())),
+    )
+    with _views_lock:
+        view = _views.get(key)
+        if view is None:
+            view = _views[key] = TableCache(table, equals, contains)
+            while len(_views) > MAX_VIEWS:
+                # Unfiltered views are module globals and must stay registered.
+                del _views[next(k for k in _views if k[1] or k[2])]
+        _views.move_to_end(key)
+        return view
+
+def _user_stats_records(user_email):
+    equals = {'User_Email': user_email}
+    return get_view(WARDROBE_TABLE, equals).records(), get_view(COMBINATIONS_TABLE, equals).records()
 
-COMBINATIONS_TABLE = Table(
-    'patO49KbikvJl3JCT.bcc975992a1f9821a40d6341ffc296bbef4eb9f19c0fb1811e4e159f7de223ea',
-    'appdgbGbEz1Dtynvg',
-    'combinations_data'
-)
+def _views_of(table):
+    with _views_lock:
+        return [v for k, v in _views.items() if k[0] == table.name]
 
-def load_data():
-    wardrobe_records = WARDROBE_TABLE.all()
-    combinations_records = COMBINATIONS_TABLE.all()
+def record_saved(table, record):
+    for view in _views_of(table):
+        view.upsert(record)
+    STATS.saved(table.name, record)
 
+def record_deleted(table, record_id):
+    for view in _views_of(table):
+        view.remove(record_id)
+    STATS.deleted(table.name, record_id)
+
+def invalidate_views(table):
+    for view in _views_of(table):
+        view.invalidate()
+
+
+def _create_committed(table_name, pending, created):
+    table = get_table(table_name)
+    record_deleted(table, pending['id'])
+    record_saved(table, created)
+
+def _create_failed(table_name, pending, error):
+    record_deleted(get_table(table_name), pending['id'])
+
+WRITE_QUEUE = WriteBehindQueue(JOURNAL_PATH, _create_committed, _create_failed)
+
+def cancel_user_writes(user_email):
+    # Queued creates of a user whose data is being deleted must not land
+    # after the deletion; ones already being sent are waited for.
+    dropped = WRITE_QUEUE.cancel(lambda name, rec: rec['fields'].get('User_Email') == user_email)
+    for table_name, record in dropped:
+        record_deleted(get_table(table_name), record['id'])
+    return dropped
+if WRITE_QUEUE.pending():
+    WRITE_QUEUE.start()
+
+
+STATS.user_records = _user_stats_records
+
+WARDROBE_CACHE = get_view(WARDROBE_TABLE)
+COMBINATIONS_CACHE = get_view(COMBINATIONS_TABLE)
+
+def query_wardrobe(user_email=None, category=None, season=None, style=None):
+    equals = {'User_Email': user_email, 'Category': category}
+    contains = {'Season': season, 'Style': style}
+    return get_view(
+        WARDROBE_TABLE,
+        {f: v for f, v in equals.items() if v is not None},
+        {f: v for f, v in contains.items() if v is not None},
+    ).records()
+
+def query_combinations(user_email=None):
+    equals = {'User_Email': user_email} if user_email is not None else None
+    return get_view(COMBINATIONS_TABLE, equals).records()
+
+
+def warm_views(views):
+    # Fetches every view that needs a full reload in one concurrent round.
+    cold = [view for view in views if view.needs_full_sync()]
+    if len(cold) < 2:
+        return
+    started = datetime.now(timezone.utc)
+    results = fetch_many([(view.table.name, view.predicates()) for view in cold])
+    for view, records in zip(cold, results):
+        view.install(records, started)
+
+def data_version(user_email=None):
+    equals = {'User_Email': user_email} if user_email else None
+    return (
+        user_email,
+        get_view(WARDROBE_TABLE, equals).version,
+        get_view(COMBINATIONS_TABLE, equals).version,
+    )
+
+
+_frames_lock = threading.Lock()
+_frames = OrderedDict()
+
+
+def load_data(user_email=None):
+    wardrobe_view = get_view(WARDROBE_TABLE, {'User_Email': user_email} if user_email else None)
+    combinations_view = get_view(COMBINATIONS_TABLE, {'User_Email': user_email} if user_email else None)
+    warm_views([wardrobe_view, combinations_view])
+    wardrobe_records = wardrobe_view.records()
+    combinations_records = combinations_view.records()
+    versions = (wardrobe_view.version, combinations_view.version)
+
+    # One entry per user: frames built from newer views replace the old ones.
+    with _frames_lock:
+        cached = _frames.get(user_email)
+        if cached is None or cached[0] != versions:
+            cached = _frames[user_email] = (versions, _build_frames(wardrobe_records, combinations_records))
+            while len(_frames) > MAX_VIEWS:
+                _frames.popitem(last=False)
+        _frames.move_to_end(user_email)
+        loaded_wardrobe_df, loaded_combinations_df = cached[1]
+
+    return loaded_wardrobe_df.copy(), loaded_combinations_df.copy()
+
+def _build_frames(wardrobe_records, combinations_records):
     loaded_wardrobe_df = pd.DataFrame(
         [rec['fields'] for rec in wardrobe_records if 'fields' in rec and rec['fields']]
     ) if wardrobe_records else pd.DataFrame()
@@ -43,6 +270,9 @@ def load_data():
         if col not in loaded_wardrobe_df.columns:
             loaded_wardrobe_df[col] = None
 
+    # Masks are computed from the raw lists before they are joined for display.
+    add_mask_columns(loaded_wardrobe_df)
+
     multi_select_columns = ['Style', 'Season']
     for col in multi_select_columns:
         if col in loaded_wardrobe_df.columns:
@@ -63,11 +293,12 @@ def save_data(session_state):
                 row_dict[key] = value
 
         try:
-            WARDROBE_TABLE.create(row_dict)
+            created = WRITE_QUEUE.create(WARDROBE, row_dict)
+            record_saved(WARDROBE_TABLE, created)
             st.success(f"Added {row_dict.get('Model', 'item')} to your wardrobe!")
             del session_state.new_item
         except Exception as e:
-            st.error(f"Error saving to Airtable: {str(e)}")
+            st.error(f"Error saving item: {str(e)}")
             st.error("Check if all field names match your Airtable schema")
 
     if 'new_combination' in session_state:
@@ -80,10 +311,13 @@ def save_data(session_state):
                 row_dict[key] = value
 
         try:
-            COMBINATIONS_TABLE.create(row_dict)
+            created = WRITE_QUEUE.create(COMBINATIONS, row_dict)
+            record_saved(COMBINATIONS_TABLE, created)
+            if row_dict.get('User_Email'):
+                record_combination(row_dict['User_Email'], row_dict)
             st.success("Saved rating for this combination!")
             del session_state.new_combination
             session_state.show_rating = False
         except Exception as e:
-            st.error(f"Error saving combination to Airtable: {str(e)}")
+            st.error(f"Error saving combination: {str(e)}")
             st.error(f"Data being sent: {row_dict}")
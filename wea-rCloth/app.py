@@ -2,20 +2,19 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from auth_ui import require_login, logout_button
-from profile_ui import profile_dashboard
-from wardrobe_editor import wardrobe_edit_interface
-from admin_panel import admin_panel
-import os
 
 
 
-from constants import CUSTOM_TYPES, STYLE_OPTIONS, SEASON_OPTIONS, CATEGORY_OPTIONS
-from airtable_utils import load_data, save_data
-from wardrobe_helpers import get_unique_values, matches_season, matches_style
-from ui_components import display_outfit_combo, clothing_form, rating_form
+from constants import STYLE_OPTIONS, SEASON_OPTIONS, CATEGORY_OPTIONS
+from airtable_utils import load_data, save_data, data_version
+from chart_cache import distribution_chart, scatter_chart, rating_histogram
+from stats_store import STATS, GLOBAL
+from wardrobe_helpers import get_unique_values, add_mask_columns, season_mask, style_mask
+from ui_components import display_outfit_combo, clothing_form, rating_form, manual_combination_form, failed_saves_notice
+from id_allocator import next_combination_id
+from outfit_engine import top_combinations, seen_combinations
+from affinity_store import get_affinity
 from state_management import init_session_state, update_type_options
 
 def apply_theme(theme):
@@ -46,21 +45,26 @@ def apply_theme(theme):
     st.markdown(dark_mode_css if theme == "Dark" else light_mode_css, unsafe_allow_html=True)
 
 
+OUTFIT_SUGGESTIONS = 5
+
 st.set_page_config(page_title="wea-rCloth", layout="wide")
 
-logout_button()
 require_login()
+logout_button()
 
 init_session_state()
 
 
-wardrobe_df_full, combinations_df = load_data()
 user_email = st.session_state.user['email']
 
 if st.session_state.user.get("status") == "1":
-    wardrobe_df = wardrobe_df_full.copy()  # Admin sees all
+    wardrobe_df, combinations_df = load_data()  # Admin sees all
+    version = data_version()
 else:
-    wardrobe_df = wardrobe_df_full[wardrobe_df_full['User_Email'] == user_email].copy()
+    wardrobe_df, combinations_df = load_data(user_email)
+    version = data_version(user_email)
+
+failed_saves_notice(user_email)
 
 st.sidebar.title("wea-rCloth")
 nav_options = ["Main", "Wardrobe", "Combinations", "Analysis", "Profile", "About"]
@@ -86,10 +90,10 @@ if page == "Main":
 
         new_item = clothing_form(
             st.session_state.type_options, STYLE_OPTIONS, SEASON_OPTIONS,
-            st.session_state.form_category, wardrobe_df
+            st.session_state.form_category
         )
         if new_item:
-            wardrobe_df = pd.concat([wardrobe_df, pd.DataFrame([new_item])], ignore_index=True)
+            wardrobe_df = pd.concat([wardrobe_df, add_mask_columns(pd.DataFrame([new_item]))], ignore_index=True)
             st.session_state.new_item = new_item
             save_data(st.session_state)
 
@@ -103,8 +107,8 @@ if page == "Main":
 
         if generate_button:
             valid_items = wardrobe_df[
-                wardrobe_df['Season'].apply(lambda x: matches_season(x, chosen_season)) &
-                wardrobe_df['Style'].apply(lambda x: matches_style(x, chosen_style))
+                season_mask(wardrobe_df['Season_Mask'], chosen_season) &
+                style_mask(wardrobe_df['Style_Mask'], chosen_style)
             ]
 
             if valid_items.empty:
@@ -117,42 +121,50 @@ if page == "Main":
                 if upper_df.empty or lower_df.empty or foot_df.empty:
                     st.error("Not enough items in all categories to build a complete outfit!")
                 else:
-                    upper_item = upper_df.sample(1).iloc[0]
-                    lower_item = lower_df.sample(1).iloc[0]
-                    shoe_item  = foot_df.sample(1).iloc[0]
-
-                    if not combinations_df.empty and 'Combination_ID' in combinations_df.columns:
-                        existing_codes = [
-                            code for code in combinations_df[
-                                combinations_df['User_Email'] == user_email
-                                ]['Combination_ID']
-                            if isinstance(code, str) and code.startswith('C')
-                        ]
+                    if not combinations_df.empty and 'User_Email' in combinations_df.columns:
+                        user_combos = combinations_df[combinations_df['User_Email'] == user_email]
+                    else:
+                        user_combos = pd.DataFrame()
 
-                        if existing_codes:
-                            max_num = max(int(code[1:]) for code in existing_codes)
-                            new_num = max_num + 1
-                        else:
-                            new_num = 1
+                    suggestions = top_combinations(
+                        upper_df['Model'], lower_df['Model'], foot_df['Model'],
+                        get_affinity(user_email, combinations_df),
+                        n=OUTFIT_SUGGESTIONS, seen=seen_combinations(user_combos)
+                    )
+
+                    if not suggestions:
+                        st.error("You have already rated every outfit for this Season/Style. Try other filters!")
                     else:
-                        new_num = 1
-                    combination_id = f"C{new_num:03d}"
-
-                    st.session_state.current_combination = {
-                        'Combination_ID': combination_id,
-                        'Upper_Body': upper_item['Model'],
-                        'Lower_Body': lower_item['Model'],
-                        'Footwear': shoe_item['Model'],
-                        'Season_Match': [chosen_season],
-                        'Style_Match': [chosen_style]
-                    }
-                    st.session_state.show_rating = True
+                        st.session_state.outfit_candidates = [
+                            {
+                                'Upper_Body': suggestion['Upper_Body'],
+                                'Lower_Body': suggestion['Lower_Body'],
+                                'Footwear': suggestion['Footwear'],
+                                'Season_Match': [chosen_season],
+                                'Style_Match': [chosen_style]
+                            }
+                            for suggestion in suggestions
+                        ]
+                        st.session_state.current_combination = st.session_state.outfit_candidates[0]
+                        st.session_state.show_rating = True
 
         if st.session_state.show_rating and st.session_state.current_combination:
+            candidates = st.session_state.outfit_candidates
+            if len(candidates) > 1:
+                choice = st.radio(
+                    "Suggested outfits (best first)",
+                    range(len(candidates)),
+                    format_func=lambda i: f"#{i + 1}: {candidates[i]['Upper_Body']} · "
+                                          f"{candidates[i]['Lower_Body']} · {candidates[i]['Footwear']}",
+                    horizontal=True
+                )
+                st.session_state.current_combination = candidates[choice]
             combo = st.session_state.current_combination
             display_outfit_combo(combo, wardrobe_df)
             new_combination = rating_form(combo)
             if new_combination:
+                # The id is allocated only when a suggestion is actually saved.
+                new_combination['Combination_ID'] = next_combination_id(user_email)
                 st.session_state.new_combination = new_combination
                 save_data(st.session_state)
 
@@ -162,6 +174,7 @@ if page == "Main":
 # ----------------------------
 elif page == "Wardrobe":
     if 'user' in st.session_state:
+        from wardrobe_editor import wardrobe_edit_interface
         wardrobe_edit_interface(st.session_state.user['email'])
     else:
         st.warning("Please log in to view your wardrobe.")
@@ -211,192 +224,38 @@ elif page == "Combinations":
             )
         ]
 
+    wardrobe_df_user = wardrobe_df[wardrobe_df['User_Email'] == user_email]
+
     if combo_filtered_df.empty:
         st.info("You don't have any saved combinations matching the selected filters.")
-
-        wardrobe_df_user = wardrobe_df[wardrobe_df['User_Email'] == user_email]
-
-        st.subheader("🔧 Create a Combination Manually")
-        with st.form("manual_combo_form"):
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                upper_item_id = st.selectbox("Choose Upper Body",
-                                             wardrobe_df_user[wardrobe_df_user['Category'] == 'Upper body']['Model'],
-                                             key="upper_select")
-                if upper_item_id:
-                    upper_item = wardrobe_df_user[wardrobe_df_user['Model'] == upper_item_id].iloc[0]
-                    st.markdown(
-                        f"**Type:** {upper_item['Type']}  \n**Color:** {upper_item['Color']}  \n**Style:** {upper_item['Style']}  \n**Season:** {upper_item['Season']}")
-                    image_path = upper_item.get("Image_URL", "")
-                    if image_path and isinstance(image_path, str) and os.path.exists(image_path):
-                        st.image(image_path, width=120)
-
-            with col2:
-                lower_item_id = st.selectbox("Choose Lower Body",
-                                             wardrobe_df_user[wardrobe_df_user['Category'] == 'Lower body']['Model'],
-                                             key="lower_select")
-                if lower_item_id:
-                    lower_item = wardrobe_df_user[wardrobe_df_user['Model'] == lower_item_id].iloc[0]
-                    st.markdown(
-                        f"**Type:** {lower_item['Type']}  \n**Color:** {lower_item['Color']}  \n**Style:** {lower_item['Style']}  \n**Season:** {lower_item['Season']}")
-                    image_path = lower_item.get("Image_URL", "")
-                    if image_path and isinstance(image_path, str) and os.path.exists(image_path):
-                        st.image(image_path, width=120)
-
-            with col3:
-                footwear_item_id = st.selectbox("Choose Footwear",
-                                                wardrobe_df_user[wardrobe_df_user['Category'] == 'Footwear']['Model'],
-                                                key="footwear_select")
-                if footwear_item_id:
-                    footwear_item = wardrobe_df_user[wardrobe_df_user['Model'] == footwear_item_id].iloc[0]
-                    st.markdown(
-                        f"**Type:** {footwear_item['Type']}  \n**Color:** {footwear_item['Color']}  \n**Style:** {footwear_item['Style']}  \n**Season:** {footwear_item['Season']}")
-                    image_path = footwear_item.get("Image_URL", "")
-                    if image_path and isinstance(image_path, str) and os.path.exists(image_path):
-                        st.image(image_path, width=120)
-
-            season_match = st.multiselect("Season Match", SEASON_OPTIONS)
-            style_match = st.multiselect("Style Match", STYLE_OPTIONS)
-            rating = st.slider("Rate this combination", 0, 10, 5)
-            mark_favorite = st.checkbox("❤️ Mark this combination as favorite")
-
-            create_btn = st.form_submit_button("Save Combination")
-
-        if create_btn:
-            if not (upper_item_id and lower_item_id and footwear_item_id):
-                st.warning("Please select an item for each category (Upper, Lower, Footwear).")
-            elif not season_match:
-                st.warning("Please select at least one season.")
-            elif not style_match:
-                st.warning("Please select at least one style.")
-            else:
-                # ✅ Only enter this block if everything is filled correctly
-                if not combinations_df.empty and 'User_Email' in combinations_df.columns:
-                    user_combos = combinations_df[combinations_df['User_Email'] == user_email]
-                    existing_codes = [
-                        code for code in user_combos['Combination_ID']
-                        if isinstance(code, str) and code.startswith('C')
-                    ]
-                    new_num = max([int(code[1:]) for code in existing_codes], default=0) + 1
-                else:
-                    new_num = 1
-
-                combination_id = f"C{new_num:03d}"
-                st.session_state.new_combination = {
-                    'Combination_ID': combination_id,
-                    'Upper_Body': upper_item_id,
-                    'Lower_Body': lower_item_id,
-                    'Footwear': footwear_item_id,
-                    'Season_Match': season_match,
-                    'Style_Match': style_match,
-                    'User_Email': user_email,
-                    'Rating': rating,
-                    'Favorite': mark_favorite
-                }
-                save_data(st.session_state)
-                st.success("Combination saved!")
-                st.rerun()
+        manual_combination_form(wardrobe_df_user, user_email)
     else:
-        wardrobe_df_user = wardrobe_df[wardrobe_df['User_Email'] == user_email]
-
-        st.subheader("🔧 Create a Combination Manually")
-        with st.form("manual_combo_form"):
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                upper_item_id = st.selectbox("Choose Upper Body",
-                                             wardrobe_df_user[wardrobe_df_user['Category'] == 'Upper body']['Model'],
-                                             key="upper_select")
-                if upper_item_id:
-                    upper_item = wardrobe_df_user[wardrobe_df_user['Model'] == upper_item_id].iloc[0]
-                    st.markdown(
-                        f"**Type:** {upper_item['Type']}  \n**Color:** {upper_item['Color']}  \n**Style:** {upper_item['Style']}  \n**Season:** {upper_item['Season']}")
-                    image_path = upper_item.get("Image_URL", "")
-                    if image_path and isinstance(image_path, str) and os.path.exists(image_path):
-                        st.image(image_path, width=120)
-
-            with col2:
-                lower_item_id = st.selectbox("Choose Lower Body",
-                                             wardrobe_df_user[wardrobe_df_user['Category'] == 'Lower body']['Model'],
-                                             key="lower_select")
-                if lower_item_id:
-                    lower_item = wardrobe_df_user[wardrobe_df_user['Model'] == lower_item_id].iloc[0]
-                    st.markdown(
-                        f"**Type:** {lower_item['Type']}  \n**Color:** {lower_item['Color']}  \n**Style:** {lower_item['Style']}  \n**Season:** {lower_item['Season']}")
-                    image_path = lower_item.get("Image_URL", "")
-                    if image_path and isinstance(image_path, str) and os.path.exists(image_path):
-                        st.image(image_path, width=120)
-
-            with col3:
-                footwear_item_id = st.selectbox("Choose Footwear",
-                                                wardrobe_df_user[wardrobe_df_user['Category'] == 'Footwear']['Model'],
-                                                key="footwear_select")
-                if footwear_item_id:
-                    footwear_item = wardrobe_df_user[wardrobe_df_user['Model'] == footwear_item_id].iloc[0]
-                    st.markdown(
-                        f"**Type:** {footwear_item['Type']}  \n**Color:** {footwear_item['Color']}  \n**Style:** {footwear_item['Style']}  \n**Season:** {footwear_item['Season']}")
-                    image_path = footwear_item.get("Image_URL", "")
-                    if image_path and isinstance(image_path, str) and os.path.exists(image_path):
-                        st.image(image_path, width=120)
-
-            season_match = st.multiselect("Season Match", SEASON_OPTIONS)
-            style_match = st.multiselect("Style Match", STYLE_OPTIONS)
-            rating = st.slider("Rate this combination", 0, 10, 5)
-            mark_favorite = st.checkbox("❤️ Mark this combination as favorite")
-
-            create_btn = st.form_submit_button("Save Combination")
-
-        if create_btn:
-            if not (upper_item_id and lower_item_id and footwear_item_id):
-                st.warning("Please select an item for each category (Upper, Lower, Footwear).")
-            elif not season_match:
-                st.warning("Please select at least one season.")
-            elif not style_match:
-                st.warning("Please select at least one style.")
-            else:
-                # ✅ Only enter this block if everything is filled correctly
-                if not combinations_df.empty and 'User_Email' in combinations_df.columns:
-                    user_combos = combinations_df[combinations_df['User_Email'] == user_email]
-                    existing_codes = [
-                        code for code in user_combos['Combination_ID']
-                        if isinstance(code, str) and code.startswith('C')
-                    ]
-                    new_num = max([int(code[1:]) for code in existing_codes], default=0) + 1
-                else:
-                    new_num = 1
-
-                combination_id = f"C{new_num:03d}"
-                st.session_state.new_combination = {
-                    'Combination_ID': combination_id,
-                    'Upper_Body': upper_item_id,
-                    'Lower_Body': lower_item_id,
-                    'Footwear': footwear_item_id,
-                    'Season_Match': season_match,
-                    'Style_Match': style_match,
-                    'User_Email': user_email,
-                    'Rating': rating,
-                    'Favorite': mark_favorite
-                }
-                save_data(st.session_state)
-                st.success("Combination saved!")
-                st.rerun()
+        manual_combination_form(wardrobe_df_user, user_email)
 
         display_df = combo_filtered_df.drop(columns=["User_Email"]).reset_index(drop=True)
         display_df.index = [''] * len(display_df)
         st.dataframe(display_df, use_container_width=True)
 
         st.subheader("📊 Combination Ratings Analysis")
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.histplot(combo_filtered_df['Rating'], bins=11, kde=True, ax=ax)
-        ax.set_title('Distribution of Outfit Ratings')
-        ax.set_xlabel('Rating')
-        ax.set_ylabel('Count')
-        st.pyplot(fig)
+        filters = (tuple(filter_season), tuple(filter_style), rating_range)
+        st.image(rating_histogram(version, filters, combo_filtered_df['Rating']))
 
         st.subheader("🏆 Top Rated Combinations")
-        top_combinations = combo_filtered_df.sort_values('Rating', ascending=False).head(5)
-        st.dataframe(top_combinations.drop(columns=["User_Email"]).reset_index(drop=True), use_container_width=True)
+        top_rated = combo_filtered_df.sort_values('Rating', ascending=False).head(5)
+        st.dataframe(top_rated.drop(columns=["User_Email"]).reset_index(drop=True), use_container_width=True)
+
+        st.subheader("🤝 Best Pairings")
+        affinity = get_affinity(user_email, combinations_df)
+        rated_models = [m for m in wardrobe_df_user['Model'] if m in affinity.index]
+        if rated_models:
+            pairing_model = st.selectbox("Show what goes best with", rated_models, key="pairing_select")
+            partners = affinity.best_partners(pairing_model)
+            st.dataframe(
+                pd.DataFrame(partners, columns=["Model", "Average Rating", "Times Rated Together"]),
+                use_container_width=True
+            )
+        else:
+            st.info("Rate some combinations to see which items go best together.")
 
 # ----------------------------
 # ANALYSIS PAGE
@@ -410,18 +269,9 @@ elif page == "Analysis":
 
         if viz_type in ["Pie Chart", "Bar Chart", "Line Chart"]:
             dimension = st.selectbox("Select Data Dimension", ["Category", "Type", "Style", "Color", "Season"])
-            fig, ax = plt.subplots(figsize=(10, 6))
-
-            counts = wardrobe_df[dimension].value_counts()
-            if viz_type == "Pie Chart":
-                ax.pie(counts, labels=counts.index, autopct='%1.1f%%')
-            elif viz_type == "Bar Chart":
-                counts.plot(kind='bar', ax=ax)
-            elif viz_type == "Line Chart":
-                counts.plot(kind='line', marker='o', ax=ax)
-
-            ax.set_title(f'{dimension} Distribution')
-            st.pyplot(fig)
+            scope = GLOBAL if st.session_state.user.get("status") == "1" else user_email
+            counts = pd.Series(STATS.dimension_counts(dimension, scope), dtype=int)
+            st.image(distribution_chart(version, viz_type, dimension, counts))
 
         elif viz_type == "Scatter Plot":
             col1, col2 = st.columns(2)
@@ -430,31 +280,12 @@ elif page == "Analysis":
             with col2:
                 y_dimension = st.selectbox("Y-Axis", ["Category", "Type", "Style", "Color", "Season"])
 
-            fig, ax = plt.subplots(figsize=(10, 6))
-            wardrobe_encoded = wardrobe_df.copy()
-            for dim in [x_dimension, y_dimension]:
-                categories = wardrobe_df[dim].unique()
-                category_map = {cat: i for i, cat in enumerate(categories)}
-                wardrobe_encoded[f"{dim}_encoded"] = wardrobe_df[dim].map(category_map)
-
-            ax.scatter(
-                wardrobe_encoded[f"{x_dimension}_encoded"],
-                wardrobe_encoded[f"{y_dimension}_encoded"],
-                c=wardrobe_encoded[f"{x_dimension}_encoded"],
-                alpha=0.6
-            )
-            ax.set_xticks(range(len(wardrobe_df[x_dimension].unique())))
-            ax.set_xticklabels(wardrobe_df[x_dimension].unique())
-            ax.set_yticks(range(len(wardrobe_df[y_dimension].unique())))
-            ax.set_yticklabels(wardrobe_df[y_dimension].unique())
-            ax.set_xlabel(x_dimension)
-            ax.set_ylabel(y_dimension)
-            ax.set_title(f'{y_dimension} vs {x_dimension}')
-            st.pyplot(fig)
+            st.image(scatter_chart(version, wardrobe_df, x_dimension, y_dimension))
 
 
 # Profile Page
 elif page == "Profile":
+    from profile_ui import profile_dashboard
     profile_dashboard()
 
 # ----------------------------
@@ -506,6 +337,7 @@ elif page == "About":
 
 
 elif page == "Admin Panel":
+    from admin_panel import admin_panel
     admin_panel()
 
 
@@ -0,0 +1,74 @@
+# async_client.py – concurrent Airtable reads for cold loads
+#
+# Fetches several tables at once over one aiohttp session (shared connection
+# pool), taking tokens from the same per-base bucket as request_scheduler, so a cold load takes about as long as the
+# slowest table instead of the sum of all of them. Pages inside one table are
+# still fetched in order: Airtable's offset token for page N+1 only comes
+# back with page N.
+
+import asyncio
+from urllib.parse import quote
+
+import aiohttp
+
+from request_scheduler import (get_scheduler, is_retryable, backoff_delay,
+                               retry_after_header, MAX_RETRIES)
+from storage import AIRTABLE_BASE_ID, AirtableTable, airtable_api_key
+
+API_URL = "https://api.airtable.com/v0"
+PAGE_SIZE = 100
+MAX_CONNECTIONS = 10
+
+
+async def _get_page(session, scheduler, url, params):
+    attempt = 0
+    while True:
+        wait = scheduler.bucket.reserve()
+        if attempt == 0:
+            scheduler.record_wait(wait)
+        await asyncio.sleep(wait)
+        try:
+            async with session.get(url, params=params) as response:
+                response.raise_for_status()
+                page = await response.json()
+        except Exception as exc:
+            if attempt >= MAX_RETRIES or not is_retryable(exc):
+                scheduler.record('failed')
+                raise
+            scheduler.record('retries')
+            await asyncio.sleep(backoff_delay(attempt, retry_after_header(exc)))
+            attempt += 1
+            continue
+        scheduler.record('completed')
+        return page
+
+async def _fetch_table(session, scheduler, name, predicates):
+    formula = AirtableTable.build_formula(**predicates)
+    url = f"{API_URL}/{AIRTABLE_BASE_ID}/{quote(name)}"
+    records, offset = [], None
+    while True:
+        params = {'pageSize': PAGE_SIZE}
+        if formula:
+            params['filterByFormula'] = formula
+        if offset:
+            params['offset'] = offset
+        page = await _get_page(session, scheduler, url, params)
+        records.extend(page.get('records', []))
+        offset = page.get('offset')
+        if not offset:
+            return records
+
+async def _fetch_tables(spec):
+    headers = {'Authorization': f"Bearer {airtable_api_key()}"}
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    scheduler = get_scheduler(AIRTABLE_BASE_ID)
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        results = await asyncio.gather(*(
+            _fetch_table(session, scheduler, name, predicates) for name, predicates in spec
+        ))
+    return results
+
+def fetch_tables(spec):
+    # spec: list of (table name, predicates dict) pairs; returns the records
+    # for each entry in the same order.
+    return asyncio.run(_fetch_tables(list(spec)))
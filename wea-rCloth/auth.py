@@ -1,73 +1,161 @@
 # auth.py – handles login, signup, and password hashing
 from dataclasses import fields
 
+import os
+import threading
+import time
+
 import streamlit as st
-import bcrypt
-from pyairtable import Table
 from datetime import datetime
 
-# Airtable setup for users
-USER_TABLE = Table(
-    'patO49KbikvJl3JCT.bcc975992a1f9821a40d6341ffc296bbef4eb9f19c0fb1811e4e159f7de223ea',
-    'appdgbGbEz1Dtynvg',
-    'users_data'
-)
+import auth_pool
+from auth_pool import AuthBusy, IP_THROTTLE, EMAIL_THROTTLE, needs_rehash
+from storage import get_table, USERS
+
+USER_TABLE = get_table(USERS)
+# Reverse proxies in front of the app that append to X-Forwarded-For. With 0
+# the socket peer is the client; entries further left are client-supplied.
+TRUSTED_PROXIES = int(os.environ.get("WEARCLOTH_TRUSTED_PROXIES", 0))
 
 def hash_password(password):
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return auth_pool.hash_password(password)
 
 def check_password(password, hashed):
     if not password or not hashed:
         return False
     try:
-        return bcrypt.checkpw(password.encode(), hashed.encode())
+        return auth_pool.check_password(password, hashed)
+    except AuthBusy:
+        raise
     except Exception as e:
         st.error(f"Password check failed: {e}")
         return False
 
+def client_ip():
+    # The address our outermost trusted proxy saw (the TRUSTED_PROXIES-th
+    # X-Forwarded-For entry from the right), else the socket peer.
+    try:
+        if TRUSTED_PROXIES:
+            hops = [hop.strip() for hop in (st.context.headers.get("X-Forwarded-For") or "").split(",")]
+            if len(hops) >= TRUSTED_PROXIES and hops[-TRUSTED_PROXIES]:
+                return hops[-TRUSTED_PROXIES]
+        return st.context.ip_address or "unknown"
+    except Exception:
+        return "unknown"
+
+def _throttle_message(*checks):
+    wait = max(throttle.retry_after(key) for throttle, key in checks)
+    if wait:
+        return f"Too many attempts. Try again in {int(wait) + 1} seconds."
+    return None
+
+# Seconds an email -> record id entry is trusted before it is looked up again.
+EMAIL_INDEX_TTL = 600
+
+_email_index = {}
+_email_index_lock = threading.Lock()
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+def _index_get(key):
+    with _email_index_lock:
+        entry = _email_index.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        _email_index.pop(key, None)
+        return None
+
+def _index_put(key, record_id):
+    with _email_index_lock:
+        _email_index[key] = (record_id, time.monotonic() + EMAIL_INDEX_TTL)
+
+def forget_email(email):
+    with _email_index_lock:
+        _email_index.pop(normalize_email(email), None)
+
 def email_exists(email):
+    key = normalize_email(email)
+    if not key:
+        return None
+
+    record_id = _index_get(key)
+    if record_id:
+        try:
+            rec = USER_TABLE.get(record_id)
+            if normalize_email(rec.get('fields', {}).get('Email')) == key:
+                return rec
+        except Exception:
+            pass
+        forget_email(key)
+
     try:
-        records = USER_TABLE.all()
+        rec = USER_TABLE.first(iequals={'Email': key})
     except Exception as e:
         st.error(f"Error accessing user table: {e}")
         return None
 
-    for rec in records:
-        if rec.get('fields', {}).get('Email', '').lower() == email.lower():
-            return rec
-    return None
+    if rec:
+        _index_put(key, rec['id'])
+    return rec
 
 def signup_user(email, password, username):
+    ip = client_ip()
+    throttled = _throttle_message((IP_THROTTLE, ip))
+    if throttled:
+        return False, throttled
+    IP_THROTTLE.hit(ip)
+
     if email_exists(email):
         return False, "Email already registered."
 
-    password_hash = hash_password(password)
+    try:
+        password_hash = hash_password(password)
+    except AuthBusy as e:
+        return False, str(e)
     try:
 
-        USER_TABLE.create({
-            'Email': email,
+        created = USER_TABLE.create({
+            'Email': normalize_email(email),
             'Password_Hash': password_hash,
             'Status': 0,
             'Bio': 'New User',
             'Username': username,
             'Created_At': datetime.utcnow().isoformat()
         })
+        _index_put(normalize_email(email), created['id'])
 
         return True, "Account created successfully."
     except Exception as e:
         return False, f"Signup failed: {str(e)}"
 
 def login_user(email, password):
+    ip, key = client_ip(), normalize_email(email)
+    # Checked before any lookup or hashing, so rejected attempts cost nothing.
+    throttled = _throttle_message((IP_THROTTLE, ip), (EMAIL_THROTTLE, key))
+    if throttled:
+        return None, throttled
+    IP_THROTTLE.hit(ip)
+
     rec = email_exists(email)
     if not rec:
+        EMAIL_THROTTLE.hit(key)
         return None, "No user with that email."
 
     stored_hash = rec['fields'].get('Password_Hash')
     if not stored_hash:
         return None, "No password stored for this user."
 
-    if not check_password(password, stored_hash):
-        return None, "Incorrect password."
+    try:
+        if not check_password(password, stored_hash):
+            EMAIL_THROTTLE.hit(key)
+            return None, "Incorrect password."
+    except AuthBusy as e:
+        return None, str(e)
+    EMAIL_THROTTLE.reset(key)
+
+    if needs_rehash(stored_hash):
+        _rehash(rec['id'], password)
 
     user_data = {
         'id': rec['id'],
@@ -78,3 +166,12 @@ def login_user(email, password):
         'username': rec['fields'].get('Username', '')
     }
     return user_data, None
+
+
+def _rehash(record_id, password):
+    # BCRYPT_ROUNDS changed since this hash was made; the plain password is
+    # only available at login, so upgrade it now. Failures keep the old hash.
+    try:
+        USER_TABLE.update(record_id, {'Password_Hash': hash_password(password)})
+    except Exception:
+        pass
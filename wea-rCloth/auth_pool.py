@@ -0,0 +1,127 @@
+# auth_pool.py – bcrypt off the script thread, with bounded CPU and throttling
+#
+# Hashing and checking run on a small dedicated pool, so at most AUTH_WORKERS
+# cores ever do bcrypt work and the Streamlit threads only wait. bcrypt drops
+# the GIL while hashing, so worker threads run in parallel like processes
+# would; a process pool can't be used here because Streamlit installs the app
+# script as __main__, which spawned workers would re-run.
+#
+# When AUTH_QUEUE_LIMIT jobs are already waiting, new ones are refused instead
+# of queued. Throttle keeps sliding-window counts per IP and per email so
+# repeated attempts are rejected before any hashing happens.
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+AUTH_WORKERS = int(os.environ.get("AUTH_WORKERS", min(2, os.cpu_count() or 1)))
+AUTH_QUEUE_LIMIT = AUTH_WORKERS * 8
+AUTH_TIMEOUT = 30
+# Distinct IPs/emails a Throttle tracks at most.
+THROTTLE_MAX_KEYS = 100_000
+
+
+class AuthBusy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(AUTH_QUEUE_LIMIT)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(AUTH_WORKERS, thread_name_prefix="bcrypt")
+        return _pool
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise AuthBusy("Too many sign-ins in progress, please try again in a moment.")
+    try:
+        return _get_pool().submit(fn, *args).result(timeout=AUTH_TIMEOUT)
+    finally:
+        _slots.release()
+
+def hash_password(password, rounds=None):
+    return _run(_hash, password, rounds or BCRYPT_ROUNDS)
+
+def check_password(password, hashed):
+    return _run(_check, password, hashed)
+
+def hash_rounds(hashed):
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+class Throttle:
+    def __init__(self, limit, window, max_keys=THROTTLE_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = defaultdict(deque)
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        hits = self._hits[key]
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+        return hits
+
+    def retry_after(self, key):
+        # Seconds until `key` may try again; 0 when it isn't throttled.
+        with self._lock:
+            now = time.monotonic()
+            hits = self._prune(key, now)
+            if len(hits) < self.limit:
+                return 0
+            return hits[0] + self.window - now
+
+    def _sweep(self, now):
+        # Keys seen once and never again would otherwise stay forever.
+        for key in [k for k, hits in self._hits.items() if hits[-1] <= now - self.window]:
+            del self._hits[key]
+        # Still too many (e.g. rotating keys within one window): drop the
+        # keys first seen longest ago, down to 90% so this doesn't run again
+        # on the very next hit.
+        for key in list(self._hits)[:len(self._hits) - self.max_keys * 9 // 10]:
+            del self._hits[key]
+        self._last_sweep = now
+
+    def hit(self, key):
+        with self._lock:
+            now = time.monotonic()
+            self._hits[key].append(now)
+            if now - self._last_sweep >= self.window or len(self._hits) > self.max_keys:
+                self._sweep(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+# Every attempt counts against the IP; only failures count against the email.
+IP_THROTTLE = Throttle(limit=20, window=60)
+EMAIL_THROTTLE = Throttle(limit=5, window=300)
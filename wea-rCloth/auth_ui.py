@@ -1,7 +1,12 @@
 # auth_ui.py – UI logic for login/signup
 
+import json
+
 import streamlit as st
 from auth import signup_user, login_user
+from session_store import get_sessions, SESSION_TTL
+
+SESSION_COOKIE = "wearcloth_session"
 
 def login_interface():
     st.title("🔐 Welcome to wea-rCloth")
@@ -16,6 +21,8 @@ def login_interface():
             user_data, error = login_user(email, password)
             if user_data:
                 st.session_state.user = user_data
+                st.session_state.session_token = get_sessions().create(user_data)
+                st.session_state.pending_cookie = st.session_state.session_token
                 st.success(f"Welcome back, {user_data['email']}!")
                 st.rerun()
             else:
@@ -39,7 +46,38 @@ def login_interface():
                 st.error(message)
 
 
+def _write_cookie(value, max_age):
+    # Streamlit can't set cookies from the server, so the page sets it.
+    st.html(
+        "<script>"
+        f"document.cookie = '{SESSION_COOKIE}=' + {json.dumps(value)} + "
+        f"'; path=/; max-age={max_age}; SameSite=Strict' + "
+        "(location.protocol === 'https:' ? '; Secure' : '');"
+        "</script>",
+        unsafe_allow_javascript=True,
+    )
+
+def _flush_cookie():
+    # Set by login/logout, which rerun before anything could be rendered.
+    if 'pending_cookie' in st.session_state:
+        token = st.session_state.pending_cookie
+        _write_cookie(token, SESSION_TTL if token else 0)
+        del st.session_state.pending_cookie
+
+def _restore_session():
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not token:
+        return
+    user = get_sessions().user(token)
+    if user:
+        st.session_state.user = user
+        st.session_state.session_token = token
+
+
 def require_login():
+    _flush_cookie()
+    if 'user' not in st.session_state:
+        _restore_session()
     if 'user' not in st.session_state:
         st.warning("Please log in to continue.")
         login_interface()
@@ -50,6 +88,10 @@ def logout_button():
     if 'user' in st.session_state:
         with st.sidebar.expander(f"👤 {st.session_state.user.get('username', st.session_state.user['email'])}"):
             if st.button("Logout"):
+                if 'session_token' in st.session_state:
+                    get_sessions().revoke(st.session_state.session_token)
+                    del st.session_state.session_token
+                st.session_state.pending_cookie = ""
                 del st.session_state.user
                 st.rerun()
 
@@ -0,0 +1,75 @@
+# avatar_service.py – resized, one-per-user avatars with an in-memory LRU cache
+#
+# Uploaded avatars are cropped to a small square and written to
+# avatars/<user id>.png, replacing the user's previous one. Rendered bytes
+# are kept in a bounded LRU cache, and a bundled default is served when a
+# user has no avatar, so the profile page never fetches from the network.
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+AVATARS_DIR = "avatars"
+AVATAR_SIZE = 128
+MAX_CACHED_AVATARS = 256
+DEFAULT_AVATAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "default_avatar.png")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_put(path, data):
+    with _cache_lock:
+        _cache[path] = data
+        _cache.move_to_end(path)
+        while len(_cache) > MAX_CACHED_AVATARS:
+            _cache.popitem(last=False)
+
+def _cache_get(path):
+    with _cache_lock:
+        data = _cache.get(path)
+        if data is not None:
+            _cache.move_to_end(path)
+        return data
+
+def save_avatar(user_id, uploaded_file, previous_path=None):
+    with Image.open(uploaded_file) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        square = ImageOps.fit(img, (AVATAR_SIZE, AVATAR_SIZE), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    square.save(buffer, "PNG", optimize=True)
+    data = buffer.getvalue()
+
+    os.makedirs(AVATARS_DIR, exist_ok=True)
+    avatar_path = os.path.join(AVATARS_DIR, f"{user_id}.png")
+    tmp = avatar_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, avatar_path)
+    _cache_put(avatar_path, data)
+
+    # Avatars saved before this service used timestamped names.
+    if previous_path and previous_path != avatar_path and os.path.dirname(previous_path) == AVATARS_DIR:
+        if os.path.exists(previous_path):
+            os.remove(previous_path)
+        with _cache_lock:
+            _cache.pop(previous_path, None)
+    return avatar_path
+
+def avatar_bytes(avatar_path):
+    for path in (avatar_path, DEFAULT_AVATAR):
+        if not path or not isinstance(path, str):
+            continue
+        data = _cache_get(path)
+        if data is not None:
+            return data
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            _cache_put(path, data)
+            return data
+    return None
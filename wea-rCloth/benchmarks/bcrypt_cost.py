@@ -0,0 +1,55 @@
+# bcrypt_cost.py – logins/second for each bcrypt cost factor
+#
+# Run from the wea-rCloth folder:  python benchmarks/bcrypt_cost.py [rounds...]
+# Each cost is measured inline (one login at a time on the calling thread) and
+# through the auth worker pool with a burst of concurrent logins, which is
+# what the server does under load. Use it to choose BCRYPT_ROUNDS: the cost
+# should keep one login around 100-300 ms on the production machine.
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth_pool
+
+ROUNDS = [8, 10, 12]
+SECONDS_PER_RUN = 3.0
+CONCURRENT_LOGINS = 16
+PASSWORD = "correct horse battery staple"
+
+
+def inline_rate(hashed):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < SECONDS_PER_RUN:
+        auth_pool._check(PASSWORD, hashed)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+def pool_rate(hashed):
+    # Warm the workers up first so pool start-up isn't measured.
+    auth_pool.check_password(PASSWORD, hashed)
+    count, start = 0, time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENT_LOGINS) as clients:
+        while time.perf_counter() - start < SECONDS_PER_RUN:
+            list(clients.map(lambda _: auth_pool.check_password(PASSWORD, hashed), range(CONCURRENT_LOGINS)))
+            count += CONCURRENT_LOGINS
+    return count / (time.perf_counter() - start)
+
+
+def run(rounds):
+    # A burst larger than the queue limit would be refused, not measured.
+    auth_pool._slots = auth_pool.threading.BoundedSemaphore(max(auth_pool.AUTH_QUEUE_LIMIT, CONCURRENT_LOGINS))
+    print(f"workers: {auth_pool.AUTH_WORKERS}, cpus: {os.cpu_count()}")
+    print(f"{'rounds':>6} {'ms/login':>9} {'inline/s':>9} {'pool/s':>9}")
+    for cost in rounds:
+        hashed = auth_pool._hash(PASSWORD, cost)
+        inline = inline_rate(hashed)
+        pooled = pool_rate(hashed)
+        print(f"{cost:>6} {1000 / inline:>9.1f} {inline:>9.1f} {pooled:>9.1f}")
+
+
+if __name__ == "__main__":
+    run([int(r) for r in sys.argv[1:]] or ROUNDS)
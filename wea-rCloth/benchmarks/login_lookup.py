@@ -0,0 +1,86 @@
+# login_lookup.py – compares the old full-scan email lookup with the indexed one
+#
+# Run from the wea-rCloth folder:  python benchmarks/login_lookup.py
+# Airtable is replaced by an in-memory table that counts HTTP round trips
+# (100 records per page for all(), one request for first()/get()), so the
+# numbers show how lookup cost scales with the number of users.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth
+
+PAGE_SIZE = 100
+RTT_SECONDS = 0.2
+SIZES = [100, 1_000, 10_000, 100_000]
+LOOKUPS = 200
+
+
+class FakeUserTable:
+    def __init__(self, n):
+        self.requests = 0
+        self.records = {
+            f"rec{i}": {'id': f"rec{i}", 'fields': {'Email': f"user{i}@example.com"}}
+            for i in range(n)
+        }
+        self._by_email = {r['fields']['Email']: r for r in self.records.values()}
+
+    # Same predicate keywords as storage.AirtableTable.
+    def all(self, equals=None, contains=None, iequals=None, modified_after=None):
+        self.requests += -(-len(self.records) // PAGE_SIZE)
+        return list(self.records.values())
+
+    def first(self, equals=None, contains=None, iequals=None):
+        # Airtable evaluates the formula server side and returns one record.
+        self.requests += 1
+        email = (iequals or equals or {}).get('Email', '')
+        if iequals:
+            email = email.lower()
+        return self._by_email.get(email)
+
+    def get(self, record_id):
+        self.requests += 1
+        return self.records[record_id]
+
+
+def old_email_exists(table, email):
+    for rec in table.all():
+        if rec.get('fields', {}).get('Email', '').lower() == email.lower():
+            return rec
+    return None
+
+
+def run():
+    print(f"{'users':>8} {'old req/login':>14} {'old est. ms':>12} {'new req/login':>14} {'new est. ms':>12}")
+    for n in SIZES:
+        table = FakeUserTable(n)
+        auth.USER_TABLE = table
+        auth._email_index.clear()
+        emails = [f"user{(i * 7919) % n}@example.com" for i in range(LOOKUPS)]
+
+        old_lookups = emails[:20]
+        start = time.perf_counter()
+        for email in old_lookups:
+            old_email_exists(table, email)
+        old_cpu = (time.perf_counter() - start) / len(old_lookups)
+        old_requests = table.requests / len(old_lookups)
+
+        table.requests = 0
+        start = time.perf_counter()
+        for email in emails:
+            # A failed lookup would make the new path look free.
+            assert auth.email_exists(email), email
+        new_cpu = (time.perf_counter() - start) / len(emails)
+        new_requests = table.requests / len(emails)
+
+        print(
+            f"{n:>8} {old_requests:>14.1f} {(old_requests * RTT_SECONDS + old_cpu) * 1000:>12.1f}"
+            f" {new_requests:>14.1f} {(new_requests * RTT_SECONDS + new_cpu) * 1000:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,62 @@
+# startup_time.py – time from a fresh server process to the first rendered page
+#
+# Run from the wea-rCloth folder:  python benchmarks/startup_time.py
+# Each measurement starts a new Python process (cold imports, like a fresh
+# Streamlit worker) that renders one page with streamlit's AppTest against a
+# throwaway SQLite store, so no network time is included. The "eager" row
+# imports what app.py used to load up front (pyairtable, seaborn/pyplot and
+# every page module) before rendering, for comparison.
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+PAGES = ["Login", "Main", "Profile", "Analysis"]
+EAGER_IMPORTS = "import pyairtable, seaborn, matplotlib.pyplot, profile_ui, wardrobe_editor, admin_panel"
+
+SCRIPT = """
+import os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {app_dir!r})
+{eager}
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join({app_dir!r}, "app.py"), default_timeout=120)
+if {page!r} != "Login":
+    at.session_state.user = {{'id': 'rec0', 'email': 'bench@example.com', 'status': '0',
+                              'username': 'bench', 'bio': '', 'created': '', 'avatar': ''}}
+    at.run()
+    at.sidebar.selectbox[0].set_value({page!r})
+at.run()
+assert not at.exception, at.exception
+print(time.perf_counter() - start, len(sys.modules))
+"""
+
+
+def measure(page, eager, workdir):
+    env = dict(os.environ, WEARCLOTH_STORAGE="sqlite",
+               WEARCLOTH_SQLITE_PATH=os.path.join(workdir, "bench.db"))
+    code = SCRIPT.format(app_dir=APP_DIR, page=page, eager=EAGER_IMPORTS if eager else "")
+    times, modules = [], 0
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        seconds, modules = out.split()[-2:]
+        times.append(float(seconds))
+    return statistics.median(times), int(modules)
+
+
+def run():
+    print(f"{'page':>10} {'eager s':>8} {'lazy s':>8} {'eager mods':>11} {'lazy mods':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for page in PAGES:
+            eager_s, eager_mods = measure(page, True, workdir)
+            lazy_s, lazy_mods = measure(page, False, workdir)
+            print(f"{page:>10} {eager_s:>8.2f} {lazy_s:>8.2f} {eager_mods:>11} {lazy_mods:>10}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,115 @@
+# bulk_delete.py – batched, resumable deletion of a user and all their data
+#
+# Record ids are collected once and written to a job file, then deleted in
+# batches of 10 (the Airtable batch limit) on a few threads at background
+# priority, so the request scheduler serves interactive reads first.
+# Progress is saved after every batch, so a job that dies with the Streamlit
+# script can be resumed from the admin panel.
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from airtable_utils import WARDROBE_TABLE, COMBINATIONS_TABLE, get_view, record_deleted, cancel_user_writes
+from affinity_store import forget_affinity
+from auth import forget_email
+from request_scheduler import priority, BACKGROUND
+from session_store import get_sessions
+from storage import get_table, USERS
+from write_behind import is_pending
+
+BATCH_SIZE = 10
+MAX_WORKERS = 4
+JOBS_DIR = "jobs"
+
+_TABLES = {t.name: t for t in (WARDROBE_TABLE, COMBINATIONS_TABLE)}
+
+
+def _job_path(email):
+    digest = hashlib.sha1(email.lower().encode()).hexdigest()[:16]
+    return os.path.join(JOBS_DIR, f"delete_{digest}.json")
+
+def _save_job(job):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = _job_path(job['email'])
+    with open(path + ".tmp", "w") as f:
+        json.dump(job, f)
+    os.replace(path + ".tmp", path)
+
+def pending_jobs():
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    jobs = []
+    for name in sorted(os.listdir(JOBS_DIR)):
+        if name.startswith("delete_") and name.endswith(".json"):
+            with open(os.path.join(JOBS_DIR, name)) as f:
+                jobs.append(json.load(f))
+    return jobs
+
+def start_user_deletion(email, user_record_id):
+    # Queued creates are dropped (or, if already being sent, committed)
+    # first, so every record of the user has a real id by now.
+    cancel_user_writes(email)
+    pending = {}
+    for table in _TABLES.values():
+        view = get_view(table, {'User_Email': email})
+        view.invalidate()
+        pending[table.name] = [rec['id'] for rec in view.records() if not is_pending(rec['id'])]
+
+    job = {
+        'email': email,
+        'user_record_id': user_record_id,
+        'pending': pending,
+        'total': sum(len(ids) for ids in pending.values()),
+        'done': 0,
+    }
+    _save_job(job)
+    return job
+
+def run_job(job, on_progress=None):
+    job_lock = threading.Lock()
+
+    def delete_batch(table, ids):
+        with priority(BACKGROUND):
+            table.batch_delete(ids)
+        return table, ids
+
+    # Job files from before queued creates were skipped may list pending ids.
+    for name, ids in job['pending'].items():
+        job['pending'][name] = [rid for rid in ids if not is_pending(rid)]
+        job['total'] -= len(ids) - len(job['pending'][name])
+    cancel_user_writes(job['email'])
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = [
+            pool.submit(delete_batch, _TABLES[name], ids[i:i + BATCH_SIZE])
+            for name, ids in job['pending'].items()
+            for i in range(0, len(ids), BATCH_SIZE)
+        ]
+        errors = []
+        for future in as_completed(futures):
+            try:
+                table, ids = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            for record_id in ids:
+                record_deleted(table, record_id)
+            with job_lock:
+                done = set(ids)
+                job['pending'][table.name] = [rid for rid in job['pending'][table.name] if rid not in done]
+                job['done'] += len(ids)
+                _save_job(job)
+            if on_progress:
+                on_progress(job['done'], job['total'])
+
+    if errors:
+        raise errors[0]
+
+    get_table(USERS).delete(job['user_record_id'])
+    forget_email(job['email'])
+    get_sessions().revoke_user(job['user_record_id'])
+    forget_affinity(job['email'])
+    os.remove(_job_path(job['email']))
@@ -0,0 +1,92 @@
+# chart_cache.py – rendered Analysis/Combinations charts, cached as PNG bytes
+#
+# Charts are keyed by (data version, chart type, dimensions/filters) and
+# only re-rendered when one of those changes. Figures are built with the
+# object-oriented Figure API (never registered with pyplot) and cleared right
+# after rendering, so the long-lived server doesn't accumulate them.
+# matplotlib and seaborn are imported on first render, not at app start.
+
+import io
+import threading
+from collections import OrderedDict
+
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+def _render(draw):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(10, 6))
+    try:
+        ax = fig.subplots()
+        draw(ax)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+def cached_chart(key, draw):
+    global _cache_bytes
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    png = _render(draw)
+
+    with _lock:
+        if key not in _cache:
+            _cache[key] = png
+            _cache_bytes += len(png)
+            while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= len(evicted)
+    return png
+
+
+def distribution_chart(version, viz_type, dimension, counts):
+    def draw(ax):
+        if viz_type == "Pie Chart":
+            ax.pie(counts, labels=counts.index, autopct='%1.1f%%')
+        elif viz_type == "Bar Chart":
+            counts.plot(kind='bar', ax=ax)
+        elif viz_type == "Line Chart":
+            counts.plot(kind='line', marker='o', ax=ax)
+        ax.set_title(f'{dimension} Distribution')
+    return cached_chart((version, viz_type, dimension), draw)
+
+def scatter_chart(version, wardrobe_df, x_dimension, y_dimension):
+    def draw(ax):
+        wardrobe_encoded = wardrobe_df.copy()
+        for dim in [x_dimension, y_dimension]:
+            categories = wardrobe_df[dim].unique()
+            category_map = {cat: i for i, cat in enumerate(categories)}
+            wardrobe_encoded[f"{dim}_encoded"] = wardrobe_df[dim].map(category_map)
+
+        ax.scatter(
+            wardrobe_encoded[f"{x_dimension}_encoded"],
+            wardrobe_encoded[f"{y_dimension}_encoded"],
+            c=wardrobe_encoded[f"{x_dimension}_encoded"],
+            alpha=0.6
+        )
+        ax.set_xticks(range(len(wardrobe_df[x_dimension].unique())))
+        ax.set_xticklabels(wardrobe_df[x_dimension].unique())
+        ax.set_yticks(range(len(wardrobe_df[y_dimension].unique())))
+        ax.set_yticklabels(wardrobe_df[y_dimension].unique())
+        ax.set_xlabel(x_dimension)
+        ax.set_ylabel(y_dimension)
+        ax.set_title(f'{y_dimension} vs {x_dimension}')
+    return cached_chart((version, "Scatter Plot", x_dimension, y_dimension), draw)
+
+def rating_histogram(version, filters, ratings):
+    def draw(ax):
+        import seaborn as sns
+        sns.histplot(ratings, bins=11, kde=True, ax=ax)
+        ax.set_title('Distribution of Outfit Ratings')
+        ax.set_xlabel('Rating')
+        ax.set_ylabel('Count')
+    return cached_chart((version, "Rating Histogram", filters), draw)
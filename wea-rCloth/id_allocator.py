@@ -0,0 +1,60 @@
+# id_allocator.py – unique, constant-time ids for new combinations and items
+
+import re
+
+from airtable_utils import query_combinations, query_wardrobe
+from storage import get_counters
+
+
+def _max_code_number(codes, prefix):
+    numbers = [
+        int(code[len(prefix):]) for code in codes
+        if isinstance(code, str) and code.startswith(prefix) and code[len(prefix):].isdigit()
+    ]
+    return max(numbers, default=0)
+
+def next_combination_id(email):
+    def seed():
+        records = query_combinations(user_email=email)
+        return _max_code_number([r['fields'].get('Combination_ID') for r in records], 'C')
+
+    number = get_counters().next(f"combination:{email.lower()}", seed)
+    return f"C{number:03d}"
+
+def _model_prefix(category, cloth_type):
+    category_code = category.split()[0][0]
+    type_prefix = cloth_type.split("-")[0] if "-" in cloth_type else "00"
+    return f"{category_code}{type_prefix}"
+
+def _model_key(email, category, cloth_type):
+    return f"model:{email.lower()}:{category}:{cloth_type}"
+
+def _model_seed(email, category, cloth_type):
+    prefix = _model_prefix(category, cloth_type)
+
+    def seed():
+        numbers = [0]
+        for record in query_wardrobe(user_email=email, category=category):
+            fields = record['fields']
+            match = re.match(rf"{re.escape(prefix)}(\d+)", fields.get('Model') or '')
+            if fields.get('Type') == cloth_type and match:
+                numbers.append(int(match.group(1)))
+        return max(numbers)
+    return seed
+
+def format_model_id(category, cloth_type, number, styles, seasons):
+    style_code = ''.join([s[0] for s in styles]) if styles else ''
+    season_code = ''.join([s[0] for s in seasons]) if seasons else ''
+    return f"{_model_prefix(category, cloth_type)}{number:02d}{style_code.lower()}{season_code}"
+
+def preview_model_id(email, category, cloth_type, styles, seasons):
+    number = get_counters().peek(
+        _model_key(email, category, cloth_type), _model_seed(email, category, cloth_type)
+    )
+    return format_model_id(category, cloth_type, number, styles, seasons)
+
+def next_model_id(email, category, cloth_type, styles, seasons):
+    number = get_counters().next(
+        _model_key(email, category, cloth_type), _model_seed(email, category, cloth_type)
+    )
+    return format_model_id(category, cloth_type, number, styles, seasons)
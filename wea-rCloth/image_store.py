@@ -0,0 +1,94 @@
+# image_store.py – content-addressed clothing images with pre-built thumbnails
+#
+# Uploads are stored once per distinct content under images/<hash>, and the
+# 120px/200px thumbnails the UI shows are generated in a background thread
+# right after upload. Until a thumbnail exists the original is served.
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+IMAGES_DIR = "images"
+THUMBS_DIR = os.path.join(IMAGES_DIR, "thumbs")
+THUMB_SIZES = (120, 200)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbs")
+_pending = set()
+_pending_lock = threading.Lock()
+_ready = {}
+
+
+def _thumb_path(image_path, size):
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(THUMBS_DIR, str(size), f"{name}.jpg")
+
+def _make_thumbnails(image_path):
+    try:
+        with Image.open(image_path) as img:
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            for size in THUMB_SIZES:
+                target = _thumb_path(image_path, size)
+                if os.path.exists(target):
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                height = max(1, round(img.height * size / img.width))
+                thumb = img.resize((size, height), Image.LANCZOS) if img.width > size else img
+                tmp = target + ".tmp"
+                thumb.save(tmp, "JPEG", quality=85, optimize=True)
+                os.replace(tmp, target)
+    except Exception:
+        # Unreadable image: keep serving the original instead of retrying.
+        for size in THUMB_SIZES:
+            _ready[(image_path, size)] = image_path
+    finally:
+        with _pending_lock:
+            _pending.discard(image_path)
+
+def _schedule_thumbnails(image_path):
+    with _pending_lock:
+        if image_path in _pending:
+            return
+        _pending.add(image_path)
+    _executor.submit(_make_thumbnails, image_path)
+
+def store_upload(uploaded_file):
+    data = uploaded_file.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            ext = (img.format or "jpeg").lower().replace("jpeg", "jpg")
+    except Exception:
+        ext = "jpg"
+
+    image_path = os.path.join(IMAGES_DIR, digest[:2], f"{digest}.{ext}")
+    if not os.path.exists(image_path):
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        tmp = image_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, image_path)
+    if not all(os.path.exists(_thumb_path(image_path, s)) for s in THUMB_SIZES):
+        _schedule_thumbnails(image_path)
+    return image_path
+
+def image_variant(image_path, size):
+    # Returns the thumbnail for size if it is ready, otherwise the original
+    # (and queues the thumbnail, which also covers images uploaded before
+    # this store existed). Returns None when there is no image at all.
+    if not image_path or not isinstance(image_path, str):
+        return None
+    key = (image_path, size)
+    if key in _ready:
+        return _ready[key]
+    thumb = _thumb_path(image_path, size)
+    if os.path.exists(thumb):
+        _ready[key] = thumb
+        return thumb
+    if not os.path.exists(image_path):
+        return None
+    _schedule_thumbnails(image_path)
+    return image_path
@@ -0,0 +1,70 @@
+# outfit_engine.py – scores upper × lower × footwear and returns the best outfits
+#
+# Per-item and per-pair affinities come from the user's AffinityMatrix
+# (smoothed rating averages relative to the overall mean). The cross product
+# is scored with NumPy and pruned with a beam over upper/lower pairs, so
+# large wardrobes don't need the full three-way product. When the beam holds
+# fewer than n outfits the user hasn't rated, it is doubled until it does or
+# covers every pair, so [] means every outfit has been rated.
+
+import numpy as np
+
+from affinity_store import PARTS
+
+BEAM_WIDTH = 64
+# Small random noise so equally scored outfits (e.g. no history yet) vary.
+EXPLORATION = 0.05
+
+
+def top_combinations(upper_models, lower_models, foot_models, affinity,
+                     n=5, seen=None, rng=None):
+    upper = list(dict.fromkeys(upper_models))
+    lower = list(dict.fromkeys(lower_models))
+    foot = list(dict.fromkeys(foot_models))
+    if not upper or not lower or not foot:
+        return []
+
+    rng = rng or np.random.default_rng()
+    seen = seen or set()
+
+    ul = affinity.pair_scores(upper, lower)
+    uf = affinity.pair_scores(upper, foot)
+    lf = affinity.pair_scores(lower, foot)
+
+    partial = affinity.item_scores(upper)[:, None] + affinity.item_scores(lower)[None, :] + ul
+    partial = partial + EXPLORATION * rng.standard_normal(partial.shape)
+
+    flat = partial.ravel()
+    foot_scores = affinity.item_scores(foot)
+    width = min(BEAM_WIDTH, flat.size)
+    while True:
+        beam = np.argpartition(-flat, width - 1)[:width]
+        bi, bj = np.unravel_index(beam, partial.shape)
+
+        total = flat[beam][:, None] + foot_scores[None, :] + uf[bi, :] + lf[bj, :]
+
+        results = []
+        for k in np.argsort(-total, axis=None):
+            b, f = np.unravel_index(k, total.shape)
+            combo = (upper[bi[b]], lower[bj[b]], foot[f])
+            if combo in seen:
+                continue
+            results.append({
+                'Upper_Body': combo[0],
+                'Lower_Body': combo[1],
+                'Footwear': combo[2],
+                'Score': float(total[b, f]),
+            })
+            if len(results) == n:
+                break
+        if len(results) == n or width == flat.size:
+            return results
+        width = min(2 * width, flat.size)
+
+
+def seen_combinations(combinations_df):
+    if combinations_df is None or combinations_df.empty:
+        return set()
+    if any(col not in combinations_df.columns for col in PARTS):
+        return set()
+    return set(combinations_df[PARTS].itertuples(index=False, name=None))
@@ -2,43 +2,32 @@
 
 import streamlit as st
 import pandas as pd
-from airtable_utils import WARDROBE_TABLE, COMBINATIONS_TABLE
-import os
+from airtable_utils import query_combinations
+from avatar_service import save_avatar, avatar_bytes
+from session_store import get_sessions
+from stats_store import STATS
 
 
-def get_user_clothes(email):
-    records = WARDROBE_TABLE.all()
-    return [r for r in records if r['fields'].get('User_Email') == email]
-
 def get_user_combos(email):
-    records = COMBINATIONS_TABLE.all()
-    return [r for r in records if r['fields'].get('User_Email') == email]
+    return query_combinations(user_email=email)
 
 def profile_dashboard():
     user = st.session_state.user
     st.title("👤 My Profile")
 
-    avatar_url = user.get("avatar")
-    if avatar_url and os.path.exists(avatar_url):
-        st.image(avatar_url, width=100)
-    else:
-        st.image("https://avatars.githubusercontent.com/u/9919?s=200&v=4", width=100)
+    st.image(avatar_bytes(user.get("avatar")), width=100)
 
     st.markdown("### 🖼️ Update Avatar")
     new_avatar = st.file_uploader("Upload New Avatar", type=["jpg", "jpeg", "png"])
-    if new_avatar:
-        os.makedirs("avatars", exist_ok=True)
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"{user['username']}_{timestamp}.jpg"
-        avatar_path = os.path.join("avatars", filename)
-        with open(avatar_path, "wb") as f:
-            f.write(new_avatar.getbuffer())
-
+    # The uploader keeps its file across reruns; process each upload once.
+    if new_avatar and st.session_state.get("avatar_upload_id") != new_avatar.file_id:
+        st.session_state.avatar_upload_id = new_avatar.file_id
         try:
+            avatar_path = save_avatar(user['id'], new_avatar, user.get("avatar"))
             from auth import USER_TABLE
             USER_TABLE.update(user['id'], {"Avatar_URL": avatar_path})
             st.session_state.user["avatar"] = avatar_path
+            get_sessions().update_user(st.session_state.user)
             st.success("Avatar updated!")
             st.rerun()
         except Exception as e:
@@ -53,11 +42,15 @@ def profile_dashboard():
     else:
         st.write("**Joined:** Unknown")
 
-    clothes = get_user_clothes(user['email'])
     combos = get_user_combos(user['email'])
 
-    st.metric("👚 Clothes Added", len(clothes))
-    st.metric("👕 Outfit Combos", len(combos))
+    st.metric("👚 Clothes Added", STATS.item_count(user['email']))
+    st.metric("👕 Outfit Combos", STATS.combo_count(user['email']))
+
+    ratings = STATS.rating_histogram(user['email'])
+    if ratings:
+        st.caption("Your outfit ratings")
+        st.bar_chart(pd.Series(ratings, name="Outfits"))
 
     st.markdown("---")
     st.subheader("✏️ Update Bio")
@@ -69,6 +62,7 @@ def profile_dashboard():
             USER_TABLE.update(user_id, {"Bio": new_bio})
             st.success("Bio updated!")
             st.session_state.user["bio"] = new_bio
+            get_sessions().update_user(st.session_state.user)
         except Exception as e:
             st.error(f"Failed to update bio: {e}")
 
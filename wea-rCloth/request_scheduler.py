@@ -0,0 +1,194 @@
+# request_scheduler.py – one queue for every Airtable request of the process
+#
+# Calls are queued by priority (interactive reads first, then writes, then
+# background jobs). Inside a call, every HTTP request (each 100-record page
+# of a listing, each 10-record batch) waits for a token of the per-base
+# bucket and is retried on its own with jittered exponential backoff on
+# 429/5xx and connection errors, so a retry never restarts a pagination.
+# Queue depth and wait times are kept for the admin panel.
+
+import itertools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+REQUESTS_PER_SECOND = 5
+BURST = 5
+WORKERS = 4
+MAX_RETRIES = 5
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+INTERACTIVE = 0
+WRITE = 1
+BACKGROUND = 2
+
+_local = threading.local()
+
+
+@contextmanager
+def priority(level):
+    # Default priority for calls made by the current thread, e.g. the
+    # worker threads of a bulk job.
+    previous = current_priority()
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+def current_priority():
+    return getattr(_local, 'priority', INTERACTIVE)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token and returns how long the caller must wait before
+        # using it (the balance may go negative; later callers wait longer).
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+def error_status(exc):
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return status if status is not None else getattr(exc, 'status', None)
+
+def is_retryable(exc):
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if type(exc).__name__ in ('ConnectionError', 'Timeout', 'ReadTimeout', 'ServerDisconnectedError'):
+        return True
+    return error_status(exc) in RETRY_STATUSES
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+def retry_after_header(exc):
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or getattr(exc, 'headers', None) or {}
+    return headers.get('Retry-After')
+
+
+class RequestScheduler:
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST, workers=WORKERS):
+        self.bucket = TokenBucket(rate, burst)
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._stats_lock = threading.Lock()
+        self._stats = {'completed': 0, 'failed': 0, 'retries': 0, 'in_flight': 0,
+                       'wait_total': 0.0, 'wait_max': 0.0}
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"airtable-{i}", daemon=True).start()
+
+    def submit(self, fn, *args, priority=None, **kwargs):
+        if priority is None:
+            priority = current_priority()
+        future = Future()
+        self._queue.put((priority, next(self._order), time.monotonic(), future, fn, args, kwargs))
+        return future
+
+    def call(self, fn, *args, priority=None, **kwargs):
+        return self.submit(fn, *args, priority=priority, **kwargs).result()
+
+    def _worker(self):
+        while True:
+            _, _, queued_at, future, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._stats_lock:
+                self._stats['in_flight'] += 1
+            try:
+                future.set_result(self._run(fn, args, kwargs, queued_at))
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._stats_lock:
+                    self._stats['in_flight'] -= 1
+
+    def _run(self, fn, args, kwargs, queued_at):
+        self.record_wait(time.monotonic() - queued_at)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record('failed')
+            raise
+        self.record('completed')
+        return result
+
+    def send(self, fn, *args, **kwargs):
+        # One HTTP request (storage wraps the shared session's request() with
+        # this): takes a token, retries retryable errors and 429/5xx
+        # responses, and returns the last response for the client to raise on.
+        attempt = 0
+        while True:
+            time.sleep(self.bucket.reserve())
+            try:
+                response = fn(*args, **kwargs)
+            except Exception as exc:
+                if attempt >= MAX_RETRIES or not is_retryable(exc):
+                    raise
+                delay = backoff_delay(attempt, retry_after_header(exc))
+            else:
+                if attempt >= MAX_RETRIES or getattr(response, 'status_code', None) not in RETRY_STATUSES:
+                    return response
+                delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+            self.record('retries')
+            time.sleep(delay)
+            attempt += 1
+
+    # Also used by async_client, which takes tokens from the same bucket
+    # without going through the queue.
+    def record_wait(self, waited):
+        with self._stats_lock:
+            self._stats['wait_total'] += waited
+            self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+
+    def record(self, outcome):
+        with self._stats_lock:
+            self._stats[outcome] += 1
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        started = stats['completed'] + stats['failed']
+        return {
+            'queue_depth': self._queue.qsize(),
+            'in_flight': stats['in_flight'],
+            'completed': stats['completed'],
+            'failed': stats['failed'],
+            'retries': stats['retries'],
+            'avg_wait': stats['wait_total'] / started if started else 0.0,
+            'max_wait': stats['wait_max'],
+        }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(base_id):
+    # Airtable's rate limit is per base, so each base gets its own bucket.
+    with _schedulers_lock:
+        if base_id not in _schedulers:
+            _schedulers[base_id] = RequestScheduler()
+        return _schedulers[base_id]
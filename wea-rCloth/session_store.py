@@ -0,0 +1,119 @@
+# session_store.py – signed, expiring login sessions kept in a local SQLite file
+#
+# A token is "<session id>.<expiry>.<signature>", signed with HMAC-SHA256 and
+# checked with hmac.compare_digest before the store is touched. The store maps
+# the (hashed) session id to the user dict that login_user returned, so a
+# returning browser is signed in without a user lookup or a bcrypt check.
+# Revoking a session deletes its row, which makes its token useless at once.
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+SESSIONS_PATH = os.environ.get("WEARCLOTH_SESSIONS_PATH", "sessions.db")
+SECRET_PATH = os.environ.get("WEARCLOTH_SESSION_SECRET_PATH", "session_secret")
+SESSION_TTL = 7 * 24 * 3600
+
+
+def _load_secret():
+    secret = os.environ.get("WEARCLOTH_SESSION_SECRET")
+    if secret:
+        return secret.encode()
+    # Generated once and kept on disk so tokens survive restarts.
+    if not os.path.exists(SECRET_PATH):
+        fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    with open(SECRET_PATH) as f:
+        return f.read().strip().encode()
+
+def _sign(secret, payload):
+    digest = hmac.new(secret, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+def _key(session_id):
+    # Only a hash of the id is stored, so a copy of the file can't be replayed.
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+class SessionStore:
+    def __init__(self, path, secret):
+        self._secret = secret
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, user_id TEXT NOT NULL, '
+                'user TEXT NOT NULL, expires INTEGER NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user_id)')
+            self._conn.execute('DELETE FROM sessions WHERE expires < ?', (int(time.time()),))
+
+    def create(self, user):
+        session_id = secrets.token_urlsafe(24)
+        expires = int(time.time()) + SESSION_TTL
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO sessions (key, user_id, user, expires) VALUES (?, ?, ?, ?)',
+                (_key(session_id), user['id'], json.dumps(user), expires)
+            )
+        payload = f"{session_id}.{expires}"
+        return f"{payload}.{_sign(self._secret, payload)}"
+
+    def _parse(self, token):
+        try:
+            session_id, expires, signature = token.split(".")
+            expires = int(expires)
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(signature, _sign(self._secret, f"{session_id}.{expires}")):
+            return None
+        if expires < time.time():
+            return None
+        return session_id
+
+    def user(self, token):
+        session_id = self._parse(token)
+        if session_id is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT user, expires FROM sessions WHERE key = ?', (_key(session_id),)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def revoke(self, token):
+        session_id = self._parse(token)
+        if session_id is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM sessions WHERE key = ?', (_key(session_id),))
+
+    def update_user(self, user):
+        # Keeps every session of this user in step with profile edits.
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE sessions SET user = ? WHERE user_id = ?', (json.dumps(user), user['id'])
+            )
+
+    def revoke_user(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+
+
+_store = {}
+_store_lock = threading.Lock()
+
+def get_sessions():
+    with _store_lock:
+        if 'sessions' not in _store:
+            _store['sessions'] = SessionStore(SESSIONS_PATH, _load_secret())
+        return _store['sessions']
@@ -6,6 +6,8 @@ from constants import CUSTOM_TYPES
 def init_session_state():
     if 'current_combination' not in st.session_state:
         st.session_state.current_combination = None
+    if 'outfit_candidates' not in st.session_state:
+        st.session_state.outfit_candidates = []
     if 'show_rating' not in st.session_state:
         st.session_state.show_rating = False
     if 'custom_types' not in st.session_state:
@@ -0,0 +1,201 @@
+# stats_store.py – wardrobe/combination counts kept up to date on every write
+#
+# Counts (items, combinations, values per Category/Type/Style/Color/Season,
+# rating histogram) are kept per scope: one per user and a global one. A
+# user's scope is built from that user's filtered view, so it costs no more
+# than the view itself; only the global scope (admins) reads the full tables.
+# Once built, a scope is adjusted by every create/update/delete that goes
+# through airtable_utils.record_saved/record_deleted, so dashboards read it in
+# O(1). A periodic rebuild picks up writes made by other processes.
+# Scopes are fetched and built without holding the store lock, so a rebuild
+# of the global scope doesn't stall saves; writes made while a scope is being
+# built are queued and replayed onto it before it is installed. Until then,
+# readers get the stale scope, or wait if there is none.
+
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+from storage import fetch_many, WARDROBE, COMBINATIONS
+
+GLOBAL = "*"
+DIMENSIONS = ['Category', 'Type', 'Style', 'Color', 'Season']
+REBUILD_INTERVAL = 600
+# Per-user scopes kept in memory before the least recently used is dropped.
+MAX_SCOPES = 256
+
+
+def _values(cell):
+    if isinstance(cell, list):
+        return [str(v) for v in cell]
+    if isinstance(cell, str):
+        return [v.strip() for v in cell.split(',') if v.strip()]
+    if cell is None or cell != cell:
+        return []
+    return [str(cell)]
+
+def _owner(record):
+    return record.get('fields', {}).get('User_Email')
+
+def _contribution(table_name, record):
+    fields = record.get('fields', {})
+    if table_name == WARDROBE:
+        return {dim: _values(fields.get(dim)) for dim in DIMENSIONS}
+    rating = fields.get('Rating')
+    return int(rating) if isinstance(rating, (int, float)) and rating == rating else None
+
+
+class _Scope:
+    def __init__(self, wardrobe_records, combination_records):
+        self.built_at = time.monotonic()
+        self.contrib = {}
+        self.items = 0
+        self.combos = 0
+        self.dims = defaultdict(Counter)
+        self.ratings = Counter()
+        for record in wardrobe_records:
+            self.add(WARDROBE, record)
+        for record in combination_records:
+            self.add(COMBINATIONS, record)
+
+    def stale(self):
+        return time.monotonic() - self.built_at >= REBUILD_INTERVAL
+
+    def _apply(self, table_name, detail, sign):
+        if table_name == WARDROBE:
+            self.items += sign
+            for dim, values in detail.items():
+                for value in values:
+                    self.dims[dim][value] += sign
+        else:
+            self.combos += sign
+            if detail is not None:
+                self.ratings[detail] += sign
+
+    def add(self, table_name, record):
+        self.remove(table_name, record['id'])
+        detail = _contribution(table_name, record)
+        self.contrib[(table_name, record['id'])] = detail
+        self._apply(table_name, detail, +1)
+
+    def remove(self, table_name, record_id):
+        key = (table_name, record_id)
+        if key in self.contrib:
+            self._apply(table_name, self.contrib.pop(key), -1)
+
+
+class StatsStore:
+    def __init__(self, max_scopes=MAX_SCOPES):
+        self.max_scopes = max_scopes
+        # email -> (wardrobe records, combination records) of that user;
+        # airtable_utils points this at its cached per-user views.
+        self.user_records = None
+        self._lock = threading.Lock()
+        self._built = threading.Condition(self._lock)
+        self._scopes = OrderedDict()
+        # scope -> writes made since its build started, as functions of a _Scope
+        self._building = {}
+
+    def _load(self, scope):
+        if scope == GLOBAL:
+            return fetch_many([(WARDROBE, {}), (COMBINATIONS, {})])
+        if self.user_records is not None:
+            return self.user_records(scope)
+        user = {'equals': {'User_Email': scope}}
+        return fetch_many([(WARDROBE, user), (COMBINATIONS, user)])
+
+    def _finish(self, scope, state):
+        # Replays the writes queued during the build and installs the scope;
+        # state is None when the build failed. Called without the lock.
+        with self._lock:
+            writes = self._building.pop(scope)
+            if state is not None:
+                for write in writes:
+                    write(state)
+                self._scopes[scope] = state
+                self._scopes.move_to_end(scope)
+                while len(self._scopes) > self.max_scopes:
+                    # The global scope is the expensive one to rebuild; drop users first.
+                    del self._scopes[next(k for k in self._scopes if k != GLOBAL)]
+            self._built.notify_all()
+
+    def _scope(self, scope):
+        with self._lock:
+            while True:
+                state = self._scopes.get(scope)
+                if state is not None and not state.stale():
+                    self._scopes.move_to_end(scope)
+                    return state
+                if scope not in self._building:
+                    self._building[scope] = []
+                    break
+                if state is not None:
+                    return state
+                self._built.wait()
+        state = None
+        try:
+            state = _Scope(*self._load(scope))
+        finally:
+            self._finish(scope, state)
+        return state
+
+    def fetch_with(self, *names):
+        # Reads the given tables, plus the full tables when the global scope
+        # needs a rebuild, in one concurrent round.
+        spec = [(name, {}) for name in names]
+        with self._lock:
+            state = self._scopes.get(GLOBAL)
+            rebuild = (state is None or state.stale()) and GLOBAL not in self._building
+            if rebuild:
+                self._building[GLOBAL] = []
+        if not rebuild:
+            return fetch_many(spec)
+        state = None
+        try:
+            results = fetch_many(spec + [(WARDROBE, {}), (COMBINATIONS, {})])
+            state = _Scope(*results[len(names):])
+        finally:
+            self._finish(GLOBAL, state)
+        return results[:len(names)]
+
+    def saved(self, table_name, record):
+        # Scopes neither built nor building have nothing to adjust; their
+        # build will include this record.
+        with self._lock:
+            for scope in (GLOBAL, _owner(record)):
+                if scope in self._scopes:
+                    self._scopes[scope].add(table_name, record)
+                if scope in self._building:
+                    self._building[scope].append(lambda state: state.add(table_name, record))
+
+    def deleted(self, table_name, record_id):
+        with self._lock:
+            for state in self._scopes.values():
+                state.remove(table_name, record_id)
+            for writes in self._building.values():
+                writes.append(lambda state: state.remove(table_name, record_id))
+
+    def item_count(self, scope=GLOBAL):
+        state = self._scope(scope)
+        with self._lock:
+            return state.items
+
+    def combo_count(self, scope=GLOBAL):
+        state = self._scope(scope)
+        with self._lock:
+            return state.combos
+
+    def dimension_counts(self, dimension, scope=GLOBAL):
+        state = self._scope(scope)
+        with self._lock:
+            counts = state.dims[dimension]
+            return {value: n for value, n in counts.most_common() if n > 0}
+
+    def rating_histogram(self, scope=GLOBAL):
+        state = self._scope(scope)
+        with self._lock:
+            ratings = state.ratings
+            return {rating: n for rating, n in sorted(ratings.items()) if n > 0}
+
+
+STATS = StatsStore()
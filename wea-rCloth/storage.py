@@ -0,0 +1,369 @@
+# storage.py – storage backends for wardrobe, combinations and users
+#
+# Both backends expose the same table interface and return Airtable-shaped
+# records ({'id', 'createdTime', 'fields'}), so the rest of the app does not
+# care where the data lives. Pick one with WEARCLOTH_STORAGE=airtable|sqlite.
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from request_scheduler import get_scheduler, current_priority, WRITE
+
+STORAGE_BACKEND = os.environ.get("WEARCLOTH_STORAGE", "airtable")
+SQLITE_PATH = os.environ.get("WEARCLOTH_SQLITE_PATH", "wearcloth.db")
+AIRTABLE_BASE_ID = os.environ.get("AIRTABLE_BASE_ID", 'appdgbGbEz1Dtynvg')
+
+WARDROBE = 'wardrobe_data'
+COMBINATIONS = 'combinations_data'
+USERS = 'users_data'
+
+# Fields looked up by equality get an index in the SQLite backend.
+INDEXED_FIELDS = {
+    WARDROBE: ['User_Email', 'Model'],
+    COMBINATIONS: ['User_Email', 'Combination_ID'],
+    USERS: [],
+}
+# Fields matched case-insensitively (iequals=...).
+NOCASE_FIELDS = {
+    USERS: ['Email'],
+}
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def now_iso():
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+def quote(value):
+    escaped = str(value).replace('\\', '\\\\').replace("'", "\\'")
+    return f"'{escaped}'"
+
+def field_contains(cell, value):
+    if isinstance(cell, list):
+        return value in cell
+    if isinstance(cell, str):
+        return value in [item.strip() for item in cell.split(',')]
+    return False
+
+
+def airtable_api_key():
+    # From the environment or .streamlit/secrets.toml; never from the code.
+    key = os.environ.get("AIRTABLE_API_KEY")
+    if not key:
+        try:
+            import streamlit as st
+            key = st.secrets.get("AIRTABLE_API_KEY")
+        except Exception:
+            key = None
+    if not key:
+        raise RuntimeError(
+            "AIRTABLE_API_KEY is not set. Export it or add it to "
+            ".streamlit/secrets.toml (or use WEARCLOTH_STORAGE=sqlite)."
+        )
+    return key
+
+
+_api = {}
+_api_lock = threading.Lock()
+
+def get_api():
+    # One pyairtable client (one pooled HTTP session) for every table. Every
+    # HTTP request of the session goes through the request scheduler, which
+    # rate-limits and retries per request, so the client's own retrying is
+    # turned off.
+    with _api_lock:
+        if 'api' not in _api:
+            from pyairtable import Api
+            api = Api(airtable_api_key(), retry_strategy=None)
+            send = api.session.request
+            scheduler = get_scheduler(AIRTABLE_BASE_ID)
+            api.session.request = lambda *args, **kwargs: scheduler.send(send, *args, **kwargs)
+            _api['api'] = api
+        return _api['api']
+
+
+class AirtableTable:
+    def __init__(self, name):
+        self.name = name
+        self._client = None
+        self._scheduler = get_scheduler(AIRTABLE_BASE_ID)
+
+    @property
+    def _table(self):
+        if self._client is None:
+            self._client = get_api().table(AIRTABLE_BASE_ID, self.name)
+        return self._client
+
+    def _read(self, fn, *args, **kwargs):
+        return self._scheduler.call(fn, *args, **kwargs)
+
+    def _write(self, fn, *args, **kwargs):
+        # Writes never jump ahead of reads; background jobs stay behind both.
+        return self._scheduler.call(fn, *args, priority=max(WRITE, current_priority()), **kwargs)
+
+    @staticmethod
+    def build_formula(equals=None, contains=None, iequals=None, modified_after=None):
+        parts = [f"{{{field}}}={quote(value)}" for field, value in (equals or {}).items()]
+        parts += [
+            f"LOWER(TRIM({{{field}}}))={quote(str(value).strip().lower())}"
+            for field, value in (iequals or {}).items()
+        ]
+        parts += [
+            f"FIND({quote(value)}, ARRAYJOIN({{{field}}}, ','))"
+            for field, value in (contains or {}).items()
+        ]
+        if modified_after is not None:
+            since = modified_after.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            parts.append(f"IS_AFTER(LAST_MODIFIED_TIME(), '{since}')")
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else f"AND({', '.join(parts)})"
+
+    def all(self, equals=None, contains=None, iequals=None, modified_after=None):
+        formula = self.build_formula(equals, contains, iequals, modified_after)
+        return self._read(self._table.all, formula=formula) if formula else self._read(self._table.all)
+
+    def first(self, equals=None, contains=None, iequals=None):
+        formula = self.build_formula(equals, contains, iequals)
+        return self._read(self._table.first, formula=formula) if formula else self._read(self._table.first)
+
+    def get(self, record_id):
+        return self._read(self._table.get, record_id)
+
+    def create(self, fields):
+        return self._write(self._table.create, fields)
+
+    def batch_create(self, records):
+        return self._write(self._table.batch_create, list(records))
+
+    def update(self, record_id, fields):
+        return self._write(self._table.update, record_id, fields)
+
+    def delete(self, record_id):
+        return self._write(self._table.delete, record_id)
+
+    def batch_delete(self, record_ids):
+        return self._write(self._table.batch_delete, list(record_ids))
+
+
+class SQLiteTable:
+    # One SQLite table per Airtable table; fields are stored as JSON with
+    # expression indexes on the columns the app filters by.
+
+    def __init__(self, name, connection, lock):
+        self.name = name
+        self._conn = connection
+        self._lock = lock
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" ('
+                'id TEXT PRIMARY KEY, created_time TEXT NOT NULL, '
+                'modified_time TEXT NOT NULL, fields TEXT NOT NULL)'
+            )
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}_modified" ON "{name}" (modified_time)'
+            )
+            for field in INDEXED_FIELDS.get(name, []):
+                self._conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{name}_{field}" ON "{name}" ({self._column(field)})'
+                )
+            for field in NOCASE_FIELDS.get(name, []):
+                self._conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{name}_{field}_nocase" ON "{name}" ({self._nocase_column(field)})'
+                )
+
+    @staticmethod
+    def _column(field):
+        return f"json_extract(fields, '$.{field}')"
+
+    @classmethod
+    def _nocase_column(cls, field):
+        return f"lower(trim({cls._column(field)}))"
+
+    @staticmethod
+    def _record(row):
+        return {'id': row[0], 'createdTime': row[1], 'fields': json.loads(row[3])}
+
+    def _select(self, equals=None, contains=None, iequals=None, modified_after=None, limit=None):
+        clauses, params = [], []
+        for field, value in (equals or {}).items():
+            clauses.append(f"{self._column(field)} = ?")
+            params.append(value)
+        for field, value in (iequals or {}).items():
+            clauses.append(f"{self._nocase_column(field)} = ?")
+            params.append(str(value).strip().lower())
+        if modified_after is not None:
+            clauses.append("modified_time > ?")
+            params.append(modified_after.strftime(TIME_FORMAT))
+
+        sql = f'SELECT id, created_time, modified_time, fields FROM "{self.name}"'
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY rowid"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        records = [self._record(row) for row in rows]
+        if contains:
+            # Multi-select predicates run on the already narrowed rows.
+            records = [
+                r for r in records
+                if all(field_contains(r['fields'].get(f), v) for f, v in contains.items())
+            ]
+        return records[:limit] if limit else records
+
+    def all(self, equals=None, contains=None, iequals=None, modified_after=None):
+        return self._select(equals, contains, iequals, modified_after)
+
+    def first(self, equals=None, contains=None, iequals=None):
+        records = self._select(equals, contains, iequals, limit=1)
+        return records[0] if records else None
+
+    def get(self, record_id):
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT id, created_time, modified_time, fields FROM "{self.name}" WHERE id = ?',
+                (record_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"{self.name}: no record {record_id}")
+        return self._record(row)
+
+    def create(self, fields):
+        record_id = 'rec' + uuid.uuid4().hex[:14]
+        created = now_iso()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'INSERT INTO "{self.name}" (id, created_time, modified_time, fields) VALUES (?, ?, ?, ?)',
+                (record_id, created, created, json.dumps(fields))
+            )
+        return {'id': record_id, 'createdTime': created, 'fields': dict(fields)}
+
+    def batch_create(self, records):
+        created = now_iso()
+        rows = [('rec' + uuid.uuid4().hex[:14], dict(fields)) for fields in records]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT INTO "{self.name}" (id, created_time, modified_time, fields) VALUES (?, ?, ?, ?)',
+                [(record_id, created, created, json.dumps(fields)) for record_id, fields in rows]
+            )
+        return [{'id': record_id, 'createdTime': created, 'fields': fields} for record_id, fields in rows]
+
+    def update(self, record_id, fields):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f'SELECT id, created_time, modified_time, fields FROM "{self.name}" WHERE id = ?',
+                (record_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"{self.name}: no record {record_id}")
+            merged = {**json.loads(row[3]), **fields}
+            self._conn.execute(
+                f'UPDATE "{self.name}" SET fields = ?, modified_time = ? WHERE id = ?',
+                (json.dumps(merged), now_iso(), record_id)
+            )
+        return {'id': record_id, 'createdTime': row[1], 'fields': merged}
+
+    def delete(self, record_id):
+        with self._lock, self._conn:
+            self._conn.execute(f'DELETE FROM "{self.name}" WHERE id = ?', (record_id,))
+        return {'id': record_id, 'deleted': True}
+
+    def batch_delete(self, record_ids):
+        record_ids = list(record_ids)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'DELETE FROM "{self.name}" WHERE id = ?', [(rid,) for rid in record_ids]
+            )
+        return [{'id': rid, 'deleted': True} for rid in record_ids]
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+_sqlite = {}
+
+def _sqlite_connection():
+    if 'conn' not in _sqlite:
+        conn = sqlite3.connect(SQLITE_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        _sqlite['conn'] = conn
+        _sqlite['lock'] = threading.RLock()
+    return _sqlite['conn'], _sqlite['lock']
+
+def get_table(name):
+    with _tables_lock:
+        if name not in _tables:
+            if STORAGE_BACKEND == "sqlite":
+                _tables[name] = SQLiteTable(name, *_sqlite_connection())
+            elif STORAGE_BACKEND == "airtable":
+                _tables[name] = AirtableTable(name)
+            else:
+                raise ValueError(f"Unknown WEARCLOTH_STORAGE backend: {STORAGE_BACKEND}")
+        return _tables[name]
+
+
+COUNTERS_PATH = os.environ.get("WEARCLOTH_COUNTERS_PATH", "counters.db")
+
+
+class Counters:
+    # Monotonic named counters in a local SQLite file. Increments run in a
+    # write transaction, so concurrent sessions and processes on the host
+    # never receive the same value, whichever backend holds the records.
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self._seeded = set()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+
+    def _ensure(self, key, seed):
+        # A new key starts from the highest number already used in the data;
+        # after that the counter row is the only source of truth.
+        if key in self._seeded:
+            return
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM counters WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            start = seed() if seed else 0
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO counters (key, value) VALUES (?, ?)', (key, start)
+                )
+        self._seeded.add(key)
+
+    def next(self, key, seed=None):
+        self._ensure(key, seed)
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE counters SET value = value + 1 WHERE key = ?', (key,))
+            return self._conn.execute('SELECT value FROM counters WHERE key = ?', (key,)).fetchone()[0]
+
+    def peek(self, key, seed=None):
+        self._ensure(key, seed)
+        with self._lock:
+            return self._conn.execute('SELECT value FROM counters WHERE key = ?', (key,)).fetchone()[0] + 1
+
+
+_counters = {}
+
+def get_counters():
+    with _tables_lock:
+        if 'counters' not in _counters:
+            _counters['counters'] = Counters(COUNTERS_PATH)
+        return _counters['counters']
+
+
+def fetch_many(spec):
+    # spec: list of (table name, predicates dict). Airtable tables are read
+    # concurrently through the async client; local tables are read in turn.
+    spec = list(spec)
+    if STORAGE_BACKEND == "airtable" and len(spec) > 1:
+        from async_client import fetch_tables
+        return fetch_tables(spec)
+    return [get_table(name).all(**predicates) for name, predicates in spec]
@@ -2,7 +2,12 @@
 
 import streamlit as st
 import pandas as pd
-import os
+
+from constants import STYLE_OPTIONS, SEASON_OPTIONS
+from airtable_utils import save_data, WRITE_QUEUE
+from id_allocator import next_combination_id, next_model_id, preview_model_id
+from image_store import store_upload, image_variant
+from storage import WARDROBE
 
 def display_outfit_combo(combo, wardrobe_df):
     st.subheader("Your Outfit Combination:")
@@ -13,13 +18,14 @@ def display_outfit_combo(combo, wardrobe_df):
             model = item['Model'].values[0]
             type_ = item['Type'].values[0]
             color = item['Color'].values[0]
-            image_url = item.get('Image_URL', [""]).values[0]
+            image_url = item['Image_URL'].values[0] if 'Image_URL' in item.columns else ""
+            image_path = image_variant(image_url, 200)
 
             st.markdown(f"**{part.replace('_', ' ')}:** {model} - {type_} ({color})")
 
-            if image_url and isinstance(image_url, str) and os.path.exists(image_url):
+            if image_path:
                 try:
-                    st.image(image_url, width=200)
+                    st.image(image_path, width=200)
                 except Exception as e:
                     st.warning(f"Could not display image for {model}. Error: {e}")
             else:
@@ -28,7 +34,7 @@ def display_outfit_combo(combo, wardrobe_df):
     st.write(f"**Chosen Season:** {', '.join(combo['Season_Match'])}")
     st.write(f"**Chosen Style:** {', '.join(combo['Style_Match'])}")
 
-def clothing_form(type_options, style_options, season_options, form_category, wardrobe_df):
+def clothing_form(type_options, style_options, season_options, form_category):
     with st.form("new_cloth_form"):
         cloth_type = st.selectbox("Type", type_options)
         selected_style = st.multiselect("Style", style_options, default=["Casual"])
@@ -38,32 +44,17 @@ def clothing_form(type_options, style_options, season_options, form_category, wa
         uploaded_image = st.file_uploader("Upload Image (optional)", type=["png", "jpg", "jpeg"])
 
         user_email = st.session_state.user['email']
-        existing_items = wardrobe_df[
-            (wardrobe_df['User_Email'] == user_email) &
-            (wardrobe_df['Category'] == form_category) &
-            (wardrobe_df['Type'] == cloth_type)
-            ]
-        next_number = len(existing_items) + 1 if not existing_items.empty else 1
-
-        style_code = ''.join([s[0] for s in selected_style]) if selected_style else ''
-        season_code = ''.join([s[0] for s in selected_season]) if selected_season else ''
-        category_code = form_category.split()[0][0]
-        type_prefix = cloth_type.split("-")[0] if "-" in cloth_type else "00"
-        model = f"{category_code}{type_prefix}{next_number:02d}{style_code.lower()}{season_code}"
+        model = preview_model_id(user_email, form_category, cloth_type, selected_style, selected_season)
 
         st.write(f"Generated Model ID: {model}")
 
         submitted = st.form_submit_button("Add to Wardrobe")
         if submitted:
+            # Another tab may have taken the previewed number in the meantime.
+            model = next_model_id(user_email, form_category, cloth_type, selected_style, selected_season)
             image_path = ""
             if uploaded_image is not None:
-                os.makedirs("images", exist_ok=True)
-                from datetime import datetime
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                filename = f"{model}_{timestamp}.jpg"
-                image_path = os.path.join("images", filename)
-                with open(image_path, "wb") as f:
-                    f.write(uploaded_image.getbuffer())
+                image_path = store_upload(uploaded_image)
 
             new_item = {
                 'Model': model,
@@ -90,3 +81,72 @@ def rating_form(combo):
             new_combination['User_Email'] = st.session_state.user['email']
             return new_combination
     return None
+
+def _item_picker(label, wardrobe_df_user, category, key):
+    item_id = st.selectbox(label,
+                           wardrobe_df_user[wardrobe_df_user['Category'] == category]['Model'],
+                           key=key)
+    if item_id:
+        item = wardrobe_df_user[wardrobe_df_user['Model'] == item_id].iloc[0]
+        st.markdown(
+            f"**Type:** {item['Type']}  \n**Color:** {item['Color']}  \n**Style:** {item['Style']}  \n**Season:** {item['Season']}")
+        image_path = image_variant(item.get("Image_URL", ""), 120)
+        if image_path:
+            st.image(image_path, width=120)
+    return item_id
+
+def manual_combination_form(wardrobe_df_user, user_email):
+    st.subheader("🔧 Create a Combination Manually")
+    with st.form("manual_combo_form"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            upper_item_id = _item_picker("Choose Upper Body", wardrobe_df_user, 'Upper body', "upper_select")
+        with col2:
+            lower_item_id = _item_picker("Choose Lower Body", wardrobe_df_user, 'Lower body', "lower_select")
+        with col3:
+            footwear_item_id = _item_picker("Choose Footwear", wardrobe_df_user, 'Footwear', "footwear_select")
+
+        season_match = st.multiselect("Season Match", SEASON_OPTIONS)
+        style_match = st.multiselect("Style Match", STYLE_OPTIONS)
+        rating = st.slider("Rate this combination", 0, 10, 5)
+        mark_favorite = st.checkbox("❤️ Mark this combination as favorite")
+
+        create_btn = st.form_submit_button("Save Combination")
+
+    if create_btn:
+        if not (upper_item_id and lower_item_id and footwear_item_id):
+            st.warning("Please select an item for each category (Upper, Lower, Footwear).")
+        elif not season_match:
+            st.warning("Please select at least one season.")
+        elif not style_match:
+            st.warning("Please select at least one style.")
+        else:
+            st.session_state.new_combination = {
+                'Combination_ID': next_combination_id(user_email),
+                'Upper_Body': upper_item_id,
+                'Lower_Body': lower_item_id,
+                'Footwear': footwear_item_id,
+                'Season_Match': season_match,
+                'Style_Match': style_match,
+                'User_Email': user_email,
+                'Rating': rating,
+                'Favorite': mark_favorite
+            }
+            save_data(st.session_state)
+            st.success("Combination saved!")
+            st.rerun()
+
+def failed_saves_notice(user_email):
+    # Saves the user was told about but that Airtable later rejected for good.
+    for entry in WRITE_QUEUE.failed(user_email):
+        fields = entry['record']['fields']
+        if entry['table'] == WARDROBE:
+            label = f"Item {fields.get('Model', '')}"
+        else:
+            label = f"Rating of outfit {fields.get('Combination_ID', '')}"
+        col1, col2 = st.columns([6, 1])
+        col1.error(f"⚠️ {label} could not be saved: {entry['error']}")
+        if col2.button("Dismiss", key=f"dismiss_{entry['record']['id']}"):
+            WRITE_QUEUE.dismiss(entry['record']['id'])
+            st.rerun()
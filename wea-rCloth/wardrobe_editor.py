@@ -2,18 +2,17 @@
 
 import streamlit as st
 import pandas as pd
-from airtable_utils import WARDROBE_TABLE
+from airtable_utils import WARDROBE_TABLE, query_wardrobe, record_saved, record_deleted
+from write_behind import is_pending
 
 
 def wardrobe_edit_interface(email):
     st.title("🧺 My Wardrobe")
 
-    # Load all wardrobe records
-    all_items = WARDROBE_TABLE.all()
     if st.session_state.user.get("status") == "1":
-        user_items = all_items  # Admin sees all
+        user_items = query_wardrobe()  # Admin sees all
     else:
-        user_items = [r for r in all_items if r['fields'].get('User_Email') == email]
+        user_items = query_wardrobe(user_email=email)
 
     if not user_items:
         st.info("No clothing items found.")
@@ -25,6 +24,10 @@ def wardrobe_edit_interface(email):
     selected = st.selectbox("Select a clothing item to edit/delete", df["Model"])
     selected_row = df[df["Model"] == selected].iloc[0]
 
+    if is_pending(selected_row["_id"]):
+        st.info("This item is still being saved. Edit or delete it in a moment.")
+        return
+
     with st.expander("Edit This Item"):
         new_type = st.text_input("Type", selected_row.get("Type", ""))
         new_color = st.text_input("Color", selected_row.get("Color", ""))
@@ -33,13 +36,14 @@ def wardrobe_edit_interface(email):
 
         if st.button("💾 Save Changes"):
             try:
-                WARDROBE_TABLE.update(selected_row["_id"], {
+                updated = WARDROBE_TABLE.update(selected_row["_id"], {
                     "Type": new_type,
                     "Color": new_color,
                     "Style": new_style,
                     "Season": new_season,
                     "User_Email": email
                 })
+                record_saved(WARDROBE_TABLE, updated)
                 st.success("Item updated successfully!")
                 st.rerun()
             except Exception as e:
@@ -48,6 +52,7 @@ def wardrobe_edit_interface(email):
     if st.button("❌ Delete This Item"):
         try:
             WARDROBE_TABLE.delete(selected_row["_id"])
+            record_deleted(WARDROBE_TABLE, selected_row["_id"])
             st.success("Item deleted.")
             st.rerun()
         except Exception as e:
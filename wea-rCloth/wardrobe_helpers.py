@@ -1,7 +1,10 @@
 # wardrobe_helpers.py
 
+import numpy as np
 import pandas as pd
 
+from constants import SEASON_OPTIONS, STYLE_OPTIONS
+
 def get_unique_values(df, column):
     if df is None or df.empty or column not in df.columns:
         return []
@@ -18,18 +21,39 @@ def get_unique_values(df, column):
                 all_values.add(value)
     return sorted(list(all_values))
 
-def matches_season(item_season_str, season_choice):
-    if season_choice == "Universal":
-        return True
-    if not isinstance(item_season_str, str):
-        return False
-    item_season_list = [s.strip() for s in item_season_str.split(',')]
-    return ("Universal" in item_season_list) or (season_choice in item_season_list)
-
-def matches_style(item_style_str, style_choice):
-    if style_choice == "Universal":
-        return True
-    if not isinstance(item_style_str, str):
-        return False
-    item_style_list = [s.strip() for s in item_style_str.split(',')]
-    return ("Universal" in item_style_list) or (style_choice in item_style_list)
+
+# Season/Style are stored as bitmasks (one bit per option) so outfit
+# filtering is a single vectorized AND over the whole wardrobe.
+SEASON_BITS = {season: 1 << i for i, season in enumerate(SEASON_OPTIONS)}
+STYLE_BITS = {style: 1 << i for i, style in enumerate(STYLE_OPTIONS)}
+
+def encode_mask(value, bits):
+    if isinstance(value, str):
+        value = [v.strip() for v in value.split(',')]
+    if not isinstance(value, list):
+        return 0
+    mask = 0
+    for item in value:
+        mask |= bits.get(item, 0)
+    return mask
+
+def add_mask_columns(df):
+    df['Season_Mask'] = np.fromiter(
+        (encode_mask(v, SEASON_BITS) for v in df['Season']), dtype=np.int64, count=len(df)
+    )
+    df['Style_Mask'] = np.fromiter(
+        (encode_mask(v, STYLE_BITS) for v in df['Style']), dtype=np.int64, count=len(df)
+    )
+    return df
+
+def _choice_mask(masks, choice, bits):
+    masks = np.asarray(masks, dtype=np.int64)
+    if choice == "Universal":
+        return np.ones(len(masks), dtype=bool)
+    return (masks & (bits["Universal"] | bits.get(choice, 0))) != 0
+
+def season_mask(masks, season_choice):
+    return _choice_mask(masks, season_choice, SEASON_BITS)
+
+def style_mask(masks, style_choice):
+    return _choice_mask(masks, style_choice, STYLE_BITS)
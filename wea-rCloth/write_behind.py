@@ -0,0 +1,216 @@
+# write_behind.py – journaled, batched creates so saving never waits on Airtable
+#
+# A create is appended to a local JSONL journal and acknowledged at once with
+# a pending record ("pending-…" id) that the views show immediately. A
+# background worker coalesces queued creates per table into batch_create
+# calls and hands the real records back, which then replace the pending ones.
+# Entries still in the journal when the process starts are sent again.
+# Creates rejected for good go to a dead-letter file and stay there until the
+# user who made them has seen and dismissed them.
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from request_scheduler import is_retryable
+from storage import get_table, now_iso
+
+JOURNAL_PATH = os.environ.get("WEARCLOTH_WRITE_JOURNAL", "write_queue.jsonl")
+DEAD_LETTER_PATH = os.environ.get("WEARCLOTH_WRITE_DEAD_LETTER", "write_failed.jsonl")
+PENDING_PREFIX = "pending-"
+# Wait this long after the first queued create to collect more into one batch.
+FLUSH_DELAY = 0.5
+# One Airtable batch request (10 records), so a batch is one scheduled call.
+MAX_BATCH = 10
+RETRY_INTERVAL = 30
+
+
+def is_pending(record_id):
+    return isinstance(record_id, str) and record_id.startswith(PENDING_PREFIX)
+
+
+class WriteBehindQueue:
+    def __init__(self, path, on_committed=None, on_failed=None, dead_letter_path=DEAD_LETTER_PATH):
+        self.path = path
+        self.dead_letter_path = dead_letter_path
+        self.on_committed = on_committed
+        self.on_failed = on_failed
+        self._pending = {}  # pending id -> (table name, pending record)
+        self._in_flight = set()  # pending ids of the batch being sent
+        self._failed = self._load_failed()
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._worker = None
+        self._replay()
+
+    def _append(self, entries):
+        with self._file_lock:
+            with open(self.path, "a") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _load_failed(self):
+        if not os.path.exists(self.dead_letter_path):
+            return []
+        failed = []
+        with open(self.dead_letter_path) as f:
+            for line in f:
+                try:
+                    failed.append(json.loads(line))
+                except ValueError:
+                    continue
+        return failed
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+                if entry['op'] == 'create':
+                    self._pending[entry['record']['id']] = (entry['table'], entry['record'])
+                else:
+                    self._pending.pop(entry['id'], None)
+        self._compact()
+
+    def _compact(self):
+        # Rewrites the journal with only the entries still outstanding.
+        with self._cond, self._file_lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                for table_name, record in self._pending.values():
+                    f.write(json.dumps({'op': 'create', 'table': table_name, 'record': record}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def start(self):
+        with self._cond:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+                self._cond.notify_all()
+
+    def create(self, table_name, fields):
+        record = {'id': PENDING_PREFIX + uuid.uuid4().hex[:14], 'createdTime': now_iso(), 'fields': dict(fields)}
+        with self._cond:
+            # Journaled under the queue lock so a compaction can't drop it.
+            self._append([{'op': 'create', 'table': table_name, 'record': record}])
+            self._pending[record['id']] = (table_name, record)
+            self._cond.notify_all()
+        self.start()
+        return record
+
+    def pending(self, table_name=None):
+        with self._cond:
+            return [rec for name, rec in self._pending.values() if table_name in (None, name)]
+
+    def cancel(self, match):
+        # Drops the queued creates for which match(table name, record) is true,
+        # first waiting for any of them already being sent. Returns the
+        # dropped (table name, record) pairs.
+        with self._cond:
+            while any(match(*self._pending[rid]) for rid in self._in_flight if rid in self._pending):
+                self._cond.wait()
+            dropped = [(name, rec) for name, rec in self._pending.values() if match(name, rec)]
+            if dropped:
+                self._append([{'op': 'cancelled', 'id': rec['id']} for _, rec in dropped])
+            for _, rec in dropped:
+                del self._pending[rec['id']]
+        return dropped
+
+    def failed(self, user_email=None):
+        # Dead-lettered creates ({'table', 'record', 'error', 'failed_at'}),
+        # all of them or only those of one user.
+        with self._cond:
+            return [
+                entry for entry in self._failed
+                if user_email is None or entry['record']['fields'].get('User_Email') == user_email
+            ]
+
+    def dismiss(self, record_id):
+        with self._cond, self._file_lock:
+            self._failed = [e for e in self._failed if e['record']['id'] != record_id]
+            tmp = self.dead_letter_path + ".tmp"
+            with open(tmp, "w") as f:
+                for entry in self._failed:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.dead_letter_path)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+        time.sleep(FLUSH_DELAY)
+        with self._cond:
+            if not self._pending:
+                return None, []  # cancelled while waiting
+            table_name = next(iter(self._pending.values()))[0]
+            batch = [
+                rec for name, rec in self._pending.values() if name == table_name
+            ][:MAX_BATCH]
+            self._in_flight = {rec['id'] for rec in batch}
+            return table_name, batch
+
+    def _run(self):
+        while True:
+            table_name, batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                created = get_table(table_name).batch_create([rec['fields'] for rec in batch])
+            except Exception as e:
+                if is_retryable(e):
+                    self._release()
+                    time.sleep(RETRY_INTERVAL)
+                    continue
+                self._finish(table_name, batch, None, e)
+                continue
+            self._finish(table_name, batch, created, None)
+
+    def _release(self):
+        with self._cond:
+            self._in_flight = set()
+            self._cond.notify_all()
+
+    def _finish(self, table_name, batch, created, error):
+        if error:
+            # Dead-lettered before the journal lets go of them, so a crash in
+            # between can resend a create but never lose one.
+            failed = [
+                {'table': table_name, 'record': rec, 'error': str(error), 'failed_at': now_iso()}
+                for rec in batch
+            ]
+            with self._file_lock:
+                with open(self.dead_letter_path, "a") as f:
+                    for entry in failed:
+                        f.write(json.dumps(entry) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+        self._append([{'op': 'failed' if error else 'done', 'id': rec['id']} for rec in batch])
+        with self._cond:
+            for rec in batch:
+                self._pending.pop(rec['id'], None)
+            if error:
+                self._failed.extend(failed)
+            self._in_flight = set()
+            self._cond.notify_all()
+            drained = not self._pending
+        if drained:
+            self._compact()
+
+        for i, rec in enumerate(batch):
+            if error:
+                if self.on_failed:
+                    self.on_failed(table_name, rec, error)
+            elif self.on_committed:
+                self.on_committed(table_name, rec, created[i])